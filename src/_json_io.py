@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+JSON-Ein-/Ausgabe für große Datenbank-Dateien
+Nutzt orjson/ijson falls installiert, sonst stdlib json
+"""
+
+import os
+from pathlib import Path
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+    import json
+
+try:
+    import ijson
+except ImportError:
+    ijson = None
+
+
+def loads(data):
+    """Parse JSON aus str oder bytes."""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def dumps(obj, indent=True):
+    """Serialisiere Objekt zu JSON-String (UTF-8, 2 Leerzeichen Einrückung)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+
+
+def dumpb(obj, indent=True, newline=False):
+    """Serialisiere Objekt zu JSON-Bytes (UTF-8)."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if newline:
+            option |= orjson.OPT_APPEND_NEWLINE
+        return orjson.dumps(obj, option=option)
+    text = json.dumps(obj, indent=2 if indent else None, ensure_ascii=False)
+    return (text + '\n' if newline else text).encode('utf-8')
+
+
+def canonical(obj):
+    """Deterministische, kompakte JSON-Bytes (sortierte Keys), z.B. für Hashes."""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_SORT_KEYS)
+    return json.dumps(obj, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def dump(obj, path, indent=True):
+    """Schreibe JSON-Datei atomar (Temp-Datei + os.replace), gibt Anzahl Bytes zurück."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(dumpb(obj, indent=indent, newline=True))
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return size
+
+
+def dump_stream(head, key, items, path):
+    """Schreibe {**head, key: [items...]} atomar, Elemente einzeln serialisiert (gleiches Format wie dump)."""
+    path = Path(path)
+    tmp_path = path.with_name(path.name + '.tmp')
+
+    try:
+        with open(tmp_path, 'wb') as f:
+            # Kopf ohne schliessende Klammer, danach die Liste Element für Element
+            f.write(dumpb({**head, key: []})[:-len(b'[]\n}')])
+            first = True
+            for item in items:
+                f.write(b'[\n    ' if first else b',\n    ')
+                # JSON-Strings enthalten keine rohen Zeilenumbrüche: Einrücken per replace ist sicher
+                f.write(dumpb(item).replace(b'\n', b'\n    '))
+                first = False
+            f.write(b'[]\n}\n' if first else b'\n  ]\n}\n')
+            size = f.tell()
+        os.replace(tmp_path, path)
+    except BaseException:
+        tmp_path.unlink(missing_ok=True)
+        raise
+
+    return size
+
+
+def load(path):
+    """Lade JSON-Datei."""
+    with open(path, 'rb') as f:
+        return loads(f.read())
+
+
+def iter_items(path, prefix):
+    """Iteriere Elemente unter prefix (z.B. 'module.item') ohne ganze Datei zu laden."""
+    with open(path, 'rb') as f:
+        if ijson is not None:
+            yield from ijson.items(f, prefix, use_float=True)
+            return
+        node = loads(f.read())
+
+    # Fallback ohne ijson: ganze Datei parsen und Pfad auflösen
+    *keys, last = prefix.split('.')
+    for key in keys:
+        node = node[key]
+    if last == 'item':
+        yield from node
+    else:
+        yield node[last]
@@ -3,27 +3,37 @@
 Analyse der 68 Module ohne handlungsnotwendige Kenntnisse
 """
 
-import json
+import os
+import sys
 from pathlib import Path
 from collections import defaultdict, Counter
-from bs4 import BeautifulSoup
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from lxml import etree, html as lxml_html
+
+import _json_io
 
 # Konfiguration
 JSON_FILE = Path("/Users/sascha/Documents/git/saw_notizen-inbox/it-module-master.json")
 RAW_HTML_DIR = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/raw_html")
+NUM_WORKERS = 8
+
+# Zeilenformat für create_full_list
+ROW_FORMAT = "{:3d} | {:>3s}-V{:<2s} | {:<40s} | {} | {:2d} | {}"
 
+# HTML-Dateien sind UTF-8 (phase1_download); Bytes direkt an lxml übergeben
+HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8')
 
-def load_json():
-    """Lade JSON-Datei."""
-    with open(JSON_FILE, 'r') as f:
-        return json.load(f)
+# Content-Div eines Panels (Klassen-Token, wie bs4 class_=...)
+CONTENT_XPATH = etree.XPath(
+    ".//*[contains(concat(' ', normalize-space(@class), ' '), ' mat-expansion-panel-content ')]"
+)
 
 
-def find_modules_without_kenntnisse(data):
+def find_modules_without_kenntnisse(masters):
     """Finde alle Module ohne handlungsnotwendige Kenntnisse."""
     modules = []
 
-    for master in data['module']:
+    for master in masters:
         for version in master['versionen']:
             # Prüfe ob mindestens ein Handlungsziel Kenntnisse hat
             handlungsziele = version.get('handlungsziele', [])
@@ -51,26 +61,37 @@ def analyze_patterns(modules):
     print("MUSTER-ANALYSE")
     print("="*60)
 
+    # Felder in einem Durchlauf sammeln ('N/A'[:4] bleibt 'N/A')
+    versions_list = []
+    years_list = []
+    digits_list = []
+    hz_list = []
+    for m in modules:
+        versions_list.append(m['version'])
+        years_list.append(m['pub_datum'][:4])
+        digits_list.append(m['nummer'][0])
+        hz_list.append(m['anzahl_hz'])
+
     # Versionen
-    versions = Counter(m['version'] for m in modules)
+    versions = Counter(versions_list)
     print("\nVersions-Verteilung:")
     for version, count in sorted(versions.items()):
         print(f"  V{version}: {count} Module")
 
     # Publikationsjahre
-    years = Counter(m['pub_datum'][:4] if m['pub_datum'] != 'N/A' else 'N/A' for m in modules)
+    years = Counter(years_list)
     print("\nPublikationsjahre:")
     for year, count in sorted(years.items()):
         print(f"  {year}: {count} Module")
 
     # Modul-Nummern (erste Stelle)
-    first_digits = Counter(m['nummer'][0] for m in modules)
+    first_digits = Counter(digits_list)
     print("\nModul-Nummern (erste Ziffer):")
     for digit, count in sorted(first_digits.items()):
         print(f"  {digit}xx: {count} Module")
 
     # Anzahl Handlungsziele
-    hz_counts = Counter(m['anzahl_hz'] for m in modules)
+    hz_counts = Counter(hz_list)
     print("\nAnzahl Handlungsziele:")
     for count, num in sorted(hz_counts.items()):
         print(f"  {count} HZ: {num} Module")
@@ -94,27 +115,25 @@ def check_html_example(modules):
         print("  ✗ HTML-Datei nicht gefunden!")
         return
 
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html = f.read()
-
-    soup = BeautifulSoup(html, 'lxml')
+    tree = lxml_html.fromstring(html_file.read_bytes(), parser=HTML_PARSER)
 
     # Prüfe mat-expansion-panels
-    panels = soup.find_all('mat-expansion-panel')
+    panels = tree.xpath('//mat-expansion-panel')
     print(f"\n  Anzahl mat-expansion-panels: {len(panels)}")
 
     if panels:
         for i, panel in enumerate(panels[:2], 1):  # Erste 2 Panels
-            header = panel.find('mat-expansion-panel-header')
-            content_div = panel.find(class_='mat-expansion-panel-content')
+            header = panel.find('.//mat-expansion-panel-header')
+            content_divs = CONTENT_XPATH(panel)
+            content_div = content_divs[0] if content_divs else None
 
             print(f"\n  Panel {i}:")
-            if header:
-                header_text = header.get_text().strip()
+            if header is not None:
+                header_text = header.text_content().strip()
                 print(f"    Header: {header_text[:80]}")
 
-            if content_div:
-                content_text = content_div.get_text().strip()
+            if content_div is not None:
+                content_text = content_div.text_content().strip()
                 print(f"    Content-Länge: {len(content_text)} Zeichen")
 
                 # Prüfe auf "Handlungsnotwendige Kenntnisse"
@@ -128,23 +147,101 @@ def check_html_example(modules):
                 print(f"    ✗ Kein Content-Div gefunden")
 
 
-def create_full_list(modules, data):
+def check_html_file(path):
+    """Zähle Panels und Panels mit Kenntnissen in einer HTML-Datei."""
+    tree = lxml_html.fromstring(path.read_bytes(), parser=HTML_PARSER)
+
+    panels = 0
+    panels_mit_kenntnissen = 0
+    for panel in tree.iter('mat-expansion-panel'):
+        panels += 1
+        content_divs = CONTENT_XPATH(panel)
+        if content_divs and "Handlungsnotwendige Kenntnisse" in content_divs[0].text_content():
+            panels_mit_kenntnissen += 1
+
+    return path.name, panels, panels_mit_kenntnissen
+
+
+def check_html_all(modules):
+    """Prüfe alle HTML-Dateien in RAW_HTML_DIR (parallel)."""
+    print("\n" + "="*60)
+    print(f"HTML-CHECK (alle Dateien, {NUM_WORKERS} Workers)")
+    print("="*60)
+
+    if not RAW_HTML_DIR.exists():
+        print("  ✗ HTML-Verzeichnis nicht gefunden!")
+        return
+
+    # scandir liefert DirEntry-Objekte, Path nur für passende Dateien
+    with os.scandir(RAW_HTML_DIR) as entries:
+        html_files = [
+            Path(e.path) for e in entries
+            if e.name.startswith('modul-') and e.name.endswith('.html') and e.is_file()
+        ]
+
+    ohne_kenntnisse = {f"modul-{m['nummer']}-v{m['version']}.html" for m in modules}
+    ohne_panels = []
+    mit_kenntnissen = 0
+    widersprueche = []
+    fehler = []
+
+    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
+        futures = {executor.submit(check_html_file, path): path for path in html_files}
+
+        for future in as_completed(futures):
+            # Einzelne unlesbare/defekte Dateien melden, Scan fortsetzen
+            try:
+                name, panels, panels_mit_kenntnissen = future.result()
+            except Exception as e:
+                fehler.append(f"{futures[future].name} ({e})")
+                continue
+            if panels == 0:
+                ohne_panels.append(name)
+            if panels_mit_kenntnissen:
+                mit_kenntnissen += 1
+                # JSON sagt "keine Kenntnisse", HTML enthält aber welche
+                if name in ohne_kenntnisse:
+                    widersprueche.append(name)
+
+    print(f"\n  HTML-Dateien: {len(html_files)}")
+    if fehler:
+        print(f"  ✗ Nicht lesbar: {len(fehler)}")
+        for eintrag in sorted(fehler)[:10]:
+            print(f"    - {eintrag}")
+    print(f"  Mit 'Handlungsnotwendige Kenntnisse': {mit_kenntnissen}")
+    print(f"  Ohne mat-expansion-panels: {len(ohne_panels)}")
+    if ohne_panels:
+        print(f"    Beispiele: {', '.join(sorted(ohne_panels)[:10])}")
+    print(f"  Module ohne Kenntnisse, deren HTML Kenntnisse enthält: {len(widersprueche)}")
+    if widersprueche:
+        print(f"    Beispiele: {', '.join(sorted(widersprueche)[:10])}")
+
+
+def create_full_list(modules, berufe):
     """Erstelle vollständige Liste der Module."""
     print("\n" + "="*60)
     print("VOLLSTÄNDIGE LISTE (68 Module ohne Kenntnisse)")
     print("="*60)
 
-    # Beruf-Mapping
-    beruf_map = {b['id']: b['name'] for b in data['berufe']}
+    # Beruf-Mapping (nur für die angezeigten ersten 2 Berufe pro Modul)
+    needed = {bid for m in modules for bid in m['berufe_ids'][:2]}
+    beruf_map = {b['id']: b['name'] for b in berufe if b['id'] in needed}
 
     print("\nNr. | Modul   | Titel (gekürzt)                          | Pub.Datum  | HZ | Berufe")
     print("-" * 110)
 
+    rows = []
     for i, m in enumerate(modules, 1):
         berufe_names = [beruf_map.get(b, '?')[:20] for b in m['berufe_ids'][:2]]
         berufe_str = ', '.join(berufe_names) if berufe_names else 'Keine'
 
-        print(f"{i:3d} | {m['nummer']:>3s}-V{m['version']:<2s} | {m['titel'][:40]:<40s} | {m['pub_datum']} | {m['anzahl_hz']:2d} | {berufe_str[:30]}")
+        rows.append(ROW_FORMAT.format(
+            i, m['nummer'], m['version'], m['titel'][:40], m['pub_datum'], m['anzahl_hz'], berufe_str[:30]
+        ))
+
+    # Eine Ausgabe statt einem print pro Zeile
+    if rows:
+        sys.stdout.write('\n'.join(rows) + '\n')
 
 
 def main():
@@ -153,13 +250,10 @@ def main():
     print("ANALYSE: Module ohne handlungsnotwendige Kenntnisse")
     print("="*60)
 
-    # Lade Daten
+    # Finde Module ohne Kenntnisse (Master-Module werden einzeln gestreamt)
     print("\n[1/4] Lade JSON-Daten...")
-    data = load_json()
-
-    # Finde Module ohne Kenntnisse
     print("[2/4] Identifiziere Module ohne Kenntnisse...")
-    modules = find_modules_without_kenntnisse(data)
+    modules = find_modules_without_kenntnisse(_json_io.iter_items(JSON_FILE, 'module.item'))
     print(f"  Gefunden: {len(modules)} Module")
 
     # Analysen
@@ -168,9 +262,10 @@ def main():
 
     print("\n[4/4] HTML-Check...")
     check_html_example(modules)
+    check_html_all(modules)
 
     # Liste
-    create_full_list(modules, data)
+    create_full_list(modules, _json_io.iter_items(JSON_FILE, 'berufe.item'))
 
     print("\n" + "="*60)
     print("FAZIT")
@@ -4,27 +4,87 @@ Erstellt Update-Report mit Änderungen seit letztem Update
 Vergleicht aktuelle Datenbank mit letztem Backup via content_hash
 """
 
-import json
+import functools
+import os
+from dataclasses import dataclass
 from pathlib import Path
 from datetime import datetime
 
+import _json_io
+
 # Pfade
 CURRENT_DB = Path("/Users/sascha/Documents/git/wiss_data_it-module/data/it-module-master.json")
 BACKUP_DIR = Path("/Users/sascha/Documents/git/wiss_data_it-module/data/backups")
 REPORT_DIR = Path("/Users/sascha/Documents/git/wiss_data_it-module/docs")
 
+# Statistik-Schlüssel mit Anzeigenamen für den Report
+STATISTIK_KEYS = [
+    (key, key.replace('_', ' ').title())
+    for key in ['master_module', 'versionen', 'berufe', 'handlungsziele', 'kenntnisse']
+]
+
 
 def find_latest_backup():
     """Finde neuestes Backup."""
     if not BACKUP_DIR.exists():
         return None
 
-    backups = sorted(BACKUP_DIR.glob("it-module-master-*.json"), reverse=True)
-    return backups[0] if backups else None
+    # Dateiname enthält das Datum (YYYY-MM-DD) → lexikografisches Maximum ist das neueste
+    with os.scandir(BACKUP_DIR) as entries:
+        latest = max(
+            (e.name for e in entries
+             if e.name.startswith("it-module-master-") and e.name.endswith(".json")),
+            default=None
+        )
+    return BACKUP_DIR / latest if latest else None
+
+
+@dataclass(slots=True, frozen=True)
+class VersionEntry:
+    """Für den Vergleich relevante Felder einer Modul-Version."""
+    content_hash: str | None
+    publikationsdatum: str | None
+    titel: str
+
+
+def index_modules(db):
+    """Erstelle Map "{nummer}-V{version}" -> VersionEntry."""
+    return {
+        f"{master['nummer']}-V{version['version']}": VersionEntry(
+            version.get('content_hash'),
+            version.get('publikationsdatum'),
+            master['titel_master']
+        )
+        for master in db['module']
+        for version in master['versionen']
+    }
+
+
+@dataclass(slots=True, frozen=True)
+class DbSummary:
+    """Für den Vergleich relevante Teile einer Datenbank."""
+    modules: dict
+    berufe: frozenset
+    meta: dict
+
+
+def summarize_db(db):
+    """Reduziere Datenbank auf Modul-Index, Berufsnamen und Meta-Daten."""
+    return DbSummary(
+        index_modules(db),
+        frozenset(b['name'] for b in db['berufe']),
+        db['meta']
+    )
+
+
+@functools.cache
+def load_db_summary(path):
+    """Lade Datenbank-Datei als DbSummary (gecacht pro Pfad)."""
+    return summarize_db(_json_io.load(path))
 
 
 def compare_databases(old_db, new_db):
-    """Vergleiche zwei Datenbanken und finde Änderungen."""
+    """Vergleiche zwei Datenbanken (DbSummary) und finde Änderungen."""
     changes = {
         'neue_module': [],
         'geaenderte_module': [],
@@ -34,69 +94,46 @@ def compare_databases(old_db, new_db):
         'statistik_neu': {}
     }
 
-    # Erstelle Hash-Maps
-    old_modules = {}
-    for master in old_db['module']:
-        for version in master['versionen']:
-            key = f"{master['nummer']}-V{version['version']}"
-            old_modules[key] = {
-                'master': master,
-                'version': version
-            }
-
-    new_modules = {}
-    for master in new_db['module']:
-        for version in master['versionen']:
-            key = f"{master['nummer']}-V{version['version']}"
-            new_modules[key] = {
-                'master': master,
-                'version': version
-            }
-
-    # Finde neue Module
-    for key in new_modules:
-        if key not in old_modules:
-            changes['neue_module'].append(key)
-
-    # Finde gelöschte Module
-    for key in old_modules:
-        if key not in new_modules:
-            changes['geloeschte_module'].append(key)
+    old_modules = old_db.modules
+    new_modules = new_db.modules
+    old_keys = old_modules.keys()
+    new_keys = new_modules.keys()
+
+    # Neue und gelöschte Module via Mengen-Differenz
+    changes['neue_module'] = list(new_keys - old_keys)
+    changes['geloeschte_module'] = list(old_keys - new_keys)
 
     # Finde geänderte Module (via content_hash)
-    for key in new_modules:
-        if key in old_modules:
-            old_hash = old_modules[key]['version'].get('content_hash')
-            new_hash = new_modules[key]['version'].get('content_hash')
-
-            if old_hash != new_hash:
-                changes['geaenderte_module'].append({
-                    'modul': key,
-                    'alt_datum': old_modules[key]['version'].get('publikationsdatum'),
-                    'neu_datum': new_modules[key]['version'].get('publikationsdatum'),
-                    'titel': new_modules[key]['master']['titel_master']
-                })
+    for key in new_keys & old_keys:
+        old_entry = old_modules[key]
+        new_entry = new_modules[key]
+
+        if old_entry.content_hash != new_entry.content_hash:
+            changes['geaenderte_module'].append({
+                'modul': key,
+                'alt_datum': old_entry.publikationsdatum,
+                'neu_datum': new_entry.publikationsdatum,
+                'titel': new_entry.titel
+            })
 
     # Berufe-Vergleich
-    old_berufe = {b['name'] for b in old_db['berufe']}
-    new_berufe = {b['name'] for b in new_db['berufe']}
-    changes['neue_berufe'] = sorted(new_berufe - old_berufe)
+    changes['neue_berufe'] = sorted(new_db.berufe - old_db.berufe)
 
     # Statistiken
     changes['statistik_alt'] = {
-        'master_module': old_db['meta']['anzahl_master_module'],
-        'versionen': old_db['meta']['anzahl_versionen_total'],
-        'berufe': old_db['meta']['anzahl_berufe'],
-        'handlungsziele': old_db['meta'].get('anzahl_handlungsziele_total', 0),
-        'kenntnisse': old_db['meta'].get('anzahl_kenntnisse_total', 0)
+        'master_module': old_db.meta['anzahl_master_module'],
+        'versionen': old_db.meta['anzahl_versionen_total'],
+        'berufe': old_db.meta['anzahl_berufe'],
+        'handlungsziele': old_db.meta.get('anzahl_handlungsziele_total', 0),
+        'kenntnisse': old_db.meta.get('anzahl_kenntnisse_total', 0)
     }
 
     changes['statistik_neu'] = {
-        'master_module': new_db['meta']['anzahl_master_module'],
-        'versionen': new_db['meta']['anzahl_versionen_total'],
-        'berufe': new_db['meta']['anzahl_berufe'],
-        'handlungsziele': new_db['meta'].get('anzahl_handlungsziele_total', 0),
-        'kenntnisse': new_db['meta'].get('anzahl_kenntnisse_total', 0)
+        'master_module': new_db.meta['anzahl_master_module'],
+        'versionen': new_db.meta['anzahl_versionen_total'],
+        'berufe': new_db.meta['anzahl_berufe'],
+        'handlungsziele': new_db.meta.get('anzahl_handlungsziele_total', 0),
+        'kenntnisse': new_db.meta.get('anzahl_kenntnisse_total', 0)
     }
 
     return changes
@@ -140,13 +177,12 @@ def create_report(changes, old_date, new_date):
     report.append("| Metrik | Vorher | Nachher | Differenz |")
     report.append("|--------|--------|---------|-----------|")
 
-    for key in ['master_module', 'versionen', 'berufe', 'handlungsziele', 'kenntnisse']:
+    for key, key_name in STATISTIK_KEYS:
         alt = changes['statistik_alt'][key]
         neu = changes['statistik_neu'][key]
         diff = neu - alt
         diff_str = f"+{diff}" if diff > 0 else str(diff)
 
-        key_name = key.replace('_', ' ').title()
         report.append(f"| {key_name} | {alt} | {neu} | {diff_str} |")
 
     report.append("")
@@ -202,8 +238,7 @@ def main():
 
     # Lade aktuelle Datenbank
     print("\n[1/4] Lade aktuelle Datenbank...")
-    with open(CURRENT_DB, 'r') as f:
-        new_db = json.load(f)
+    new_db = _json_io.load(CURRENT_DB)
 
     new_date = new_db['meta']['erstellt'][:10]
     print(f"  Erstellt: {new_date}")
@@ -218,8 +253,7 @@ def main():
         # Erstelle Backup
         BACKUP_DIR.mkdir(parents=True, exist_ok=True)
         backup_file = BACKUP_DIR / f"it-module-master-{new_date}.json"
-        with open(backup_file, 'w') as f:
-            json.dump(new_db, f, indent=2, ensure_ascii=False)
+        _json_io.dump(new_db, backup_file)
 
         print(f"  ✓ Backup erstellt: {backup_file.name}")
         print("\n✅ Erste Datenbank-Version gespeichert!")
@@ -227,16 +261,15 @@ def main():
 
     print(f"  Gefunden: {backup_file.name}")
 
-    # Lade Backup
-    with open(backup_file, 'r') as f:
-        old_db = json.load(f)
+    # Lade Backup (nur Vergleichsdaten werden behalten)
+    old_db = load_db_summary(backup_file)
 
-    old_date = old_db['meta']['erstellt'][:10]
+    old_date = old_db.meta['erstellt'][:10]
     print(f"  Erstellt: {old_date}")
 
     # Vergleiche
     print("\n[3/4] Analysiere Änderungen...")
-    changes = compare_databases(old_db, new_db)
+    changes = compare_databases(old_db, summarize_db(new_db))
 
     total_changes = len(changes['neue_module']) + len(changes['geaenderte_module']) + len(changes['geloeschte_module'])
     print(f"  Änderungen: {total_changes}")
@@ -255,8 +288,7 @@ def main():
     # Erstelle neues Backup
     new_backup = BACKUP_DIR / f"it-module-master-{new_date}.json"
     if not new_backup.exists():
-        with open(new_backup, 'w') as f:
-            json.dump(new_db, f, indent=2, ensure_ascii=False)
+        _json_io.dump(new_db, new_backup)
         print(f"  ✓ Backup: {new_backup.name}")
 
     # Zeige Report
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+API-Erkennung für modulbaukasten.ch
+Lädt Übersicht und erste Modul-Seite und protokolliert alle JSON-Antworten (XHR/Fetch),
+um einen Endpunkt zu finden, der ohne Browser abgefragt werden kann.
+"""
+
+import sys
+from playwright.sync_api import sync_playwright
+
+
+BASE_URL = "https://www.modulbaukasten.ch"
+JSON_RESOURCE_TYPES = {"xhr", "fetch"}
+PREVIEW_LENGTH = 200
+
+
+def log_response(response, found):
+    """Merke JSON-Antworten von XHR/Fetch-Requests."""
+    if response.request.resource_type not in JSON_RESOURCE_TYPES:
+        return
+    if 'json' not in response.headers.get('content-type', ''):
+        return
+
+    try:
+        body = response.text()
+    except Exception:
+        body = ''
+
+    found.append((response.request.method, response.status, response.url, len(body), body[:PREVIEW_LENGTH]))
+
+
+def discover(urls):
+    """Lade URLs und sammle alle JSON-Antworten."""
+    found = []
+
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True)
+        try:
+            page = browser.new_page()
+            page.on("response", lambda response: log_response(response, found))
+            for url in urls:
+                print(f"Lade {url}...")
+                page.goto(url, wait_until="networkidle", timeout=30000)
+
+            # Zusätzlich erste verlinkte Modul-Seite laden
+            link = page.query_selector('a[href*="/module/"]')
+            if link:
+                url = BASE_URL + link.get_attribute('href')
+                print(f"Lade {url}...")
+                page.goto(url, wait_until="networkidle", timeout=30000)
+        finally:
+            browser.close()
+
+    return found
+
+
+def main():
+    urls = sys.argv[1:] or [BASE_URL]
+    found = discover(urls)
+
+    print("=" * 60)
+    print(f"JSON-Antworten: {len(found)}")
+    print("=" * 60)
+
+    for method, status, url, size, preview in found:
+        print(f"\n{method} {status} {url} ({size:,} Zeichen)")
+        print(f"  {preview}")
+
+    if not found:
+        print("\nKeine JSON-API gefunden - Inhalte werden serverseitig/eingebettet gerendert.")
+
+
+if __name__ == "__main__":
+    main()
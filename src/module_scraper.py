@@ -4,113 +4,208 @@ Erweiterter Modul-Scraper für modulbaukasten.ch
 Extrahiert: Publikationsdatum, Handlungsziele, Berufe
 """
 
-import json
+import asyncio
+import hashlib
 import re
-import time
 from datetime import datetime
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-
-
-def scrape_module_list(base_url="https://www.modulbaukasten.ch/"):
+from lxml import etree, html as lxml_html
+from playwright.async_api import async_playwright
+
+import _json_io
+
+
+# Maximale Anzahl gleichzeitig offener Tabs
+MAX_CONCURRENT = 16
+
+# Chromium-Startoptionen für Headless-Scraping (kein GPU, keine Hintergrunddienste)
+BROWSER_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+# Elemente, die nach dem Rendern einer Detailseite vorhanden sind
+DETAIL_SELECTOR = "mat-expansion-panel-header, .publish"
+SELECTOR_TIMEOUT = 10000
+
+# Felder, die in den content_hash einfließen (ohne letzter_check, detail_url, IDs)
+HASH_FIELDS = ('nummer', 'version', 'titel', 'publikationsdatum', 'handlungsziele', 'berufe')
+
+# Regex-Muster (einmalig kompiliert)
+HREF_RE = re.compile(r'/module/(\d+)/(\d+)/')
+TITEL_RE = re.compile(r'(\d{3,4})V(\d+)(.*)')
+DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+HZ_RE = re.compile(r'^(\d+)\.\s*(.*)')
+
+# XPath-Ausdruck (einmalig kompiliert, Auswertung in libxml2): ein einziger Durchlauf
+# über den Baum liefert Publish-Element, Panel-Header und Berufs-Spans (Textfilter EFZ/EBA)
+DETAIL_NODES_XPATH = etree.XPath(
+    "//*[self::mat-expansion-panel-header"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' publish ')"
+    " or (self::span and contains(concat(' ', normalize-space(@class), ' '), ' ng-star-inserted ')"
+    " and (contains(translate(., 'EFZBA', 'efzba'), 'efz') or contains(translate(., 'EFZBA', 'efzba'), 'eba')))]"
+)
+
+
+async def scrape_module_list(context, base_url="https://www.modulbaukasten.ch/"):
     """Scrape die Liste aller Module von der Hauptseite."""
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
-
-        print(f"Loading module list from {base_url}")
-        page.goto(base_url, wait_until="networkidle", timeout=30000)
-        page.wait_for_timeout(3000)
-
-        html = page.content()
-        browser.close()
-
-        soup = BeautifulSoup(html, 'lxml')
-        modules = []
-
-        for item in soup.find_all('app-module-grid-item'):
-            link = item.find('a')
-            if link:
-                href = link.get('href', '')
-                # Extract nummer and version from href: /module/107/1/de-DE
-                match = re.match(r'/module/(\d+)/(\d+)/', href)
-                if match:
-                    text = item.get_text().strip()
-                    titel_match = re.match(r'(\d{3,4})V(\d+)(.*)', text)
-                    if titel_match:
-                        modules.append({
-                            'nummer': titel_match.group(1),
-                            'version': titel_match.group(2),
-                            'titel': titel_match.group(3).strip(),
-                            'detail_url': f"https://www.modulbaukasten.ch{href}"
-                        })
-
-        print(f"Found {len(modules)} modules")
-        return modules
-
-
-def scrape_module_detail(url):
-    """Scrape Detailseite eines Moduls."""
-    with sync_playwright() as p:
-        browser = p.chromium.launch(headless=True)
-        page = browser.new_page()
+    page = await context.new_page()
+
+    print(f"Loading module list from {base_url}")
+    await page.goto(base_url, wait_until="networkidle", timeout=30000)
+    await page.wait_for_timeout(3000)
+
+    html = await page.content()
+    await page.close()
+
+    tree = lxml_html.fromstring(html)
+    modules = []
+
+    for item in tree.iter('app-module-grid-item'):
+        link = item.find('.//a')
+        if link is not None:
+            href = link.get('href', '')
+            # Extract nummer and version from href: /module/107/1/de-DE
+            match = HREF_RE.match(href)
+            if match:
+                text = item.text_content().strip()
+                titel_match = TITEL_RE.match(text)
+                if titel_match:
+                    modules.append({
+                        'nummer': titel_match.group(1),
+                        'version': titel_match.group(2),
+                        'titel': titel_match.group(3).strip(),
+                        'detail_url': f"https://www.modulbaukasten.ch{href}"
+                    })
+
+    print(f"Found {len(modules)} modules")
+    return modules
+
+
+def collect_detail_nodes(tree):
+    """Sortiere die Knoten aus einem Baum-Durchlauf in Publish-, Header- und Berufs-Knoten."""
+    publish_divs, headers, beruf_spans = [], [], []
+    for el in DETAIL_NODES_XPATH(tree):
+        if el.tag == 'mat-expansion-panel-header':
+            headers.append(el)
+        elif 'publish' in (el.get('class') or '').split():
+            publish_divs.append(el)
+        else:
+            beruf_spans.append(el)
+    return publish_divs, headers, beruf_spans
+
+
+def parse_module_detail(html):
+    """Extrahiere Details aus dem HTML einer Modul-Detailseite."""
+    tree = lxml_html.fromstring(html)
+    publish_divs, headers, beruf_spans = collect_detail_nodes(tree)
+
+    details = {}
+
+    # 1. PUBLIKATIONSDATUM
+    if publish_divs:
+        text = publish_divs[0].text_content()
+        match = DATE_RE.search(text)
+        if match:
+            # Konvertiere zu ISO-Format YYYY-MM-DD
+            day, month, year = match.groups()
+            details['publikationsdatum'] = f"{year}-{month}-{day}"
+
+    # 2. HANDLUNGSZIELE
+    handlungsziele = []
+    for header in headers:
+        header_text = header.text_content().strip()
+        # Extrahiere Nummer und Text: "1. Beschreibung..."
+        match = HZ_RE.match(header_text)
+        if match:
+            handlungsziele.append({
+                'nummer': match.group(1),
+                'beschreibung': match.group(2).strip()
+            })
+
+    details['handlungsziele'] = handlungsziele
+
+    # 3. BERUFE
+    # Suche nach span-Elementen mit EFZ/EBA (Filter im XPath)
+    berufe = []
+    seen = set()
+    for span in beruf_spans:
+        text = span.text_content().strip()
+        if text in seen:  # Duplikate vermeiden
+            continue
+        # Nur wenn es wie ein Berufsname aussieht
+        if len(text) > 10 and len(text) < 150:
+            seen.add(text)
+            berufe.append(text)
+
+    details['berufe'] = berufe
+
+    return details
+
+
+async def scrape_module_detail(context, semaphore, url):
+    """Scrape Detailseite eines Moduls (max. MAX_CONCURRENT gleichzeitig)."""
+    try:
+        async with semaphore:
+            page = await context.new_page()
+            try:
+                await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+                # Auf gerenderten Inhalt warten; Timeout = Fehler statt halbes DOM speichern
+                await page.wait_for_selector(DETAIL_SELECTOR, state="attached", timeout=SELECTOR_TIMEOUT)
+
+                html = await page.content()
+            finally:
+                await page.close()
+
+        # Parsing ist reine CPU-Arbeit: im Thread, damit der Event-Loop frei bleibt
+        return await asyncio.to_thread(parse_module_detail, html)
+
+    except Exception as e:
+        print(f"Error scraping {url}: {e}")
+        return None
+
+
+async def scrape_all_modules():
+    """Lade Modulliste und scrape alle Detailseiten parallel."""
+    async with async_playwright() as p:
+        # Ein Browser + Context für alle Seiten
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        context = await browser.new_context()
 
         try:
-            page.goto(url, wait_until="networkidle", timeout=30000)
-            page.wait_for_timeout(2000)
-
-            html = page.content()
-            soup = BeautifulSoup(html, 'lxml')
-
-            details = {}
-
-            # 1. PUBLIKATIONSDATUM
-            publish_div = soup.find(class_='publish')
-            if publish_div:
-                text = publish_div.get_text()
-                match = re.search(r'(\d{2}\.\d{2}\.\d{4})', text)
-                if match:
-                    # Konvertiere zu ISO-Format YYYY-MM-DD
-                    date_str = match.group(1)
-                    day, month, year = date_str.split('.')
-                    details['publikationsdatum'] = f"{year}-{month}-{day}"
-
-            # 2. HANDLUNGSZIELE
-            handlungsziele = []
-            for panel in soup.find_all('mat-expansion-panel'):
-                header = panel.find('mat-expansion-panel-header')
-                if header:
-                    header_text = header.get_text().strip()
-                    # Extrahiere Nummer und Text: "1. Beschreibung..."
-                    match = re.match(r'^(\d+)\.\s*(.*)', header_text)
-                    if match:
-                        handlungsziele.append({
-                            'nummer': match.group(1),
-                            'beschreibung': match.group(2).strip()
-                        })
-
-            details['handlungsziele'] = handlungsziele
-
-            # 3. BERUFE
-            # Suche nach span-Elementen mit EFZ/EBA
-            berufe = []
-            for span in soup.find_all('span', class_='ng-star-inserted'):
-                text = span.get_text().strip()
-                if 'efz' in text.lower() or 'eba' in text.lower():
-                    # Nur wenn es wie ein Berufsname aussieht
-                    if len(text) > 10 and len(text) < 150:
-                        if text not in berufe:  # Duplikate vermeiden
-                            berufe.append(text)
-
-            details['berufe'] = berufe
-
-            return details
-
-        except Exception as e:
-            print(f"Error scraping {url}: {e}")
-            return None
+            # 1. Lade Modulliste
+            print("\n[1/3] Lade Modulliste...")
+            modules = await scrape_module_list(context)
+
+            # 2. Scrape Details für jedes Modul
+            total = len(modules)
+            print(f"\n[2/3] Scrape Details für {total} Module ({MAX_CONCURRENT} parallel)...")
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT)
+            done = 0
+
+            async def scrape(module):
+                nonlocal done
+                details = await scrape_module_detail(context, semaphore, module['detail_url'])
+                done += 1
+                print(f"  [{done}/{total}] Modul {module['nummer']}... {'✓' if details else '✗'}")
+                return details
+
+            results = await asyncio.gather(*(scrape(m) for m in modules))
         finally:
-            browser.close()
+            await browser.close()
+
+    return modules, results
+
+
+def calculate_content_hash(module):
+    """Berechne Hash über den Modul-Inhalt für Change Detection."""
+    content = {key: module.get(key) for key in HASH_FIELDS}
+    return hashlib.blake2b(_json_io.canonical(content), digest_size=8).hexdigest()
 
 
 def create_beruf_mapping(all_berufe):
@@ -122,58 +217,49 @@ def create_beruf_mapping(all_berufe):
     ]
 
 
+def slim_module(module, beruf_to_id, now_iso):
+    """Erstelle finalen Modul-Eintrag mit Berufs-IDs und Check-Timestamp."""
+    # Neues Dict statt del: ohne redundante Namen und detail_url
+    slim = {k: v for k, v in module.items() if k not in ('berufe', 'detail_url')}
+    if 'berufe' in module:
+        slim['berufe_ids'] = [beruf_to_id[b] for b in module['berufe']]
+    slim['letzter_check'] = now_iso
+    return slim
+
+
 def main():
     """Hauptprogramm."""
     print("="*60)
     print("Modulbaukasten.ch - Vollständiger Scraper")
     print("="*60)
 
-    # 1. Lade Modulliste
-    print("\n[1/3] Lade Modulliste...")
-    modules = scrape_module_list()
+    modules, results = asyncio.run(scrape_all_modules())
 
-    # 2. Scrape Details für jedes Modul
-    print(f"\n[2/3] Scrape Details für {len(modules)} Module...")
     all_berufe = []
-
-    for i, module in enumerate(modules):
-        print(f"  [{i+1}/{len(modules)}] Modul {module['nummer']}...", end=" ", flush=True)
-
-        details = scrape_module_detail(module['detail_url'])
+    for module, details in zip(modules, results):
         if details:
             module.update(details)
+            module['content_hash'] = calculate_content_hash(module)
             all_berufe.extend(details.get('berufe', []))
-            print("✓")
-        else:
-            print("✗")
-
-        # Kleine Pause um Server nicht zu überlasten
-        time.sleep(0.5)
 
     # 3. Erstelle Berufs-Mapping
     print("\n[3/3] Erstelle Berufs-Mapping...")
     berufe_liste = create_beruf_mapping(all_berufe)
     beruf_to_id = {beruf['name']: beruf['id'] for beruf in berufe_liste}
 
-    # Ersetze Berufsnamen durch IDs in Modulen
-    for module in modules:
-        if 'berufe' in module:
-            module['berufe_ids'] = [beruf_to_id[b] for b in module['berufe']]
-            del module['berufe']  # Entferne redundante Namen
-
-        # Entferne detail_url (nicht mehr benötigt)
-        if 'detail_url' in module:
-            del module['detail_url']
+    # Ein Check-Timestamp für den ganzen Lauf
+    now_iso = datetime.now().isoformat()
+    anzahl_module = len(modules)
 
-        # Füge Check-Timestamp hinzu
-        module['letzter_check'] = datetime.now().isoformat()
+    # Ersetze Berufsnamen durch IDs in Modulen
+    modules = [slim_module(m, beruf_to_id, now_iso) for m in modules]
 
     # 4. Erstelle finales JSON
     output = {
         'meta': {
             'quelle': 'https://www.modulbaukasten.ch/',
-            'erstellt': datetime.now().isoformat(),
-            'anzahl_module': len(modules),
+            'erstellt': now_iso,
+            'anzahl_module': anzahl_module,
             'anzahl_berufe': len(berufe_liste)
         },
         'berufe': berufe_liste,
@@ -182,13 +268,12 @@ def main():
 
     # 5. Speichern
     output_file = '/Users/sascha/Documents/git/saw_notizen-inbox/it-module-vollstaendig.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    bytes_written = _json_io.dump(output, output_file)
 
     print(f"\n✅ Erfolgreich gespeichert: {output_file}")
-    print(f"   Module: {len(modules)}")
+    print(f"   Module: {anzahl_module}")
     print(f"   Berufe: {len(berufe_liste)}")
-    print(f"   Größe: {len(json.dumps(output)) // 1024} KB")
+    print(f"   Größe: {bytes_written // 1024} KB")
 
 
 if __name__ == "__main__":
@@ -1,183 +1,460 @@
 #!/usr/bin/env python3
 """
 Parallel Master-Modul-Scraper mit 5 Workers
-Schnellere Ausführung durch Threading
+Schnellere Ausführung durch asyncio (ein Browser, Pool wiederverwendeter Contexts)
 """
 
-import json
+import asyncio
+import functools
 import re
 import time
 import hashlib
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-import threading
+from urllib.parse import urlsplit
+from lxml import etree, html as lxml_html
+from playwright.async_api import async_playwright
+
+import _json_io
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
 
 
 # Konfiguration
 BASE_URL = "https://www.modulbaukasten.ch"
 OUTPUT_DIR = Path("/Users/sascha/Documents/git/saw_notizen-inbox")
 NUM_WORKERS = 5
+CACHE_FILE = OUTPUT_DIR / ".scraper_detail_cache.json"
 MAX_RETRIES = 3
 RETRY_DELAY = 2
-
-# Thread-safe Counter
-progress_lock = threading.Lock()
-progress_counter = {'completed': 0, 'failed': 0}
-
-
+USE_HTTP = True  # Erst rohes HTML per HTTP versuchen, Playwright nur als Fallback
+HTTP_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+
+# Ein Zeitstempel pro Lauf (letzter_check, meta.erstellt)
+RUN_TS = datetime.now().isoformat()
+
+# Chromium-Startoptionen für Headless-Scraping (kein GPU, keine Hintergrunddienste)
+BROWSER_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+# Ressourcen, die für das HTML nicht gebraucht werden
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media"}
+
+# Regex-Muster (einmalig kompiliert)
+HREF_RE = re.compile(r'/module/(\d+)/(\d+)/')
+TITEL_RE = re.compile(r'(\d{3,4})V(\d+)(.*)')
+DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+HZ_RE = re.compile(r'^(\d+)\.\s*(.*)')
+# Publikationsdatum im rohen HTML (Klassen-Token "publish", nicht "publish-*"; Datum TT.MM.JJJJ)
+PUBLISH_DATE_RE = re.compile(
+    r'class="[^"]*(?<![\w-])publish(?![\w-])[^"]*"[^>]*>.{0,500}?(\d{2})\.(\d{2})\.(\d{4})', re.S
+)
+
+# XPath-Ausdruck (einmalig kompiliert, Auswertung in libxml2): ein einziger Durchlauf
+# über den Baum liefert Publish-Element, Panel-Header und Berufs-Spans (Textfilter EFZ/EBA)
+DETAIL_NODES_XPATH = etree.XPath(
+    "//*[self::mat-expansion-panel-header"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' publish ')"
+    " or (self::span and contains(concat(' ', normalize-space(@class), ' '), ' ng-star-inserted ')"
+    " and (contains(translate(., 'EFZBA', 'efzba'), 'efz') or contains(translate(., 'EFZBA', 'efzba'), 'eba')))]"
+)
+
+# Elemente, die nach dem Rendern der Angular-App vorhanden sind
+LIST_SELECTOR = "app-module-grid-item"
+DETAIL_SELECTOR = "mat-expansion-panel-header, .publish"
+SELECTOR_TIMEOUT = 10000
+
+# Elemente, deren Vorkommen im rohen HTML zeigt, dass der Server bereits gerenderten Inhalt liefert
+LIST_TAG = "app-module-grid-item"
+DETAIL_TAG = "mat-expansion-panel-header"
+
+# Pro Pfad-Präfix gemerkt, ob rohes HTTP reicht (kein Eintrag = noch nicht geprüft)
+http_mode = {}
+
+# Contexts werden nach so vielen Seiten neu erstellt (begrenzt Speicherwachstum)
+CONTEXT_MAX_USES = 50
+
+# Aus der Detailseite stammende Felder (werden im Cache abgelegt, gültig solange content_hash gleich)
+DETAIL_FIELDS = ('publikationsdatum', 'content_hash', 'handlungsziele', 'berufe', 'letzter_check')
+
+# Fortschritt (nur im Event-Loop verändert, daher ohne Lock)
+progress_counter = {'completed': 0, 'cached': 0, 'failed': 0}
+
+
+@functools.lru_cache(maxsize=None)
 def calculate_hash(pub_datum):
-    """Berechne Hash für Change Detection."""
+    """Berechne Hash für Change Detection (gecacht, viele Module teilen ein Datum)."""
     if not pub_datum:
         return None
+    # SHA-256 beibehalten, damit content_hash mit bestehenden Backups vergleichbar bleibt
     return hashlib.sha256(pub_datum.encode()).hexdigest()[:16]
 
 
-def scrape_with_retry(url, max_retries=MAX_RETRIES):
-    """Scrape URL mit Retry-Logik."""
+async def block_resources(route):
+    """Breche Requests für Bilder, CSS, Fonts und Medien ab."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+async def new_context(browser):
+    """Erstelle Context mit Ressourcen-Blocking."""
+    context = await browser.new_context()
+    await context.route("**/*", block_resources)
+    return context
+
+
+async def create_context_pool(browser, size=NUM_WORKERS):
+    """Erstelle Pool vorbereiteter Contexts (Einträge: (context, anzahl_nutzungen))."""
+    pool = asyncio.Queue()
+    for _ in range(size):
+        pool.put_nowait((await new_context(browser), 0))
+    return pool
+
+
+async def renew_context(context):
+    """Ersetze Context durch frischen im selben Browser, None falls das nicht mehr geht."""
+    browser = context.browser
+    try:
+        await context.close()
+    except Exception:
+        pass  # Alter Context wird ohnehin verworfen
+    try:
+        return await new_context(browser)
+    except Exception:
+        return None
+
+
+async def fetch_page(pool, url, selector):
+    """Lade URL mit einem Context aus dem Pool und gib ihn danach zurück."""
+    context, uses = await pool.get()
+    if context is None:
+        # Defekter Slot: zurücklegen, damit alle Worker sofort scheitern statt ewig zu warten
+        pool.put_nowait((None, 0))
+        raise RuntimeError("Kein Browser-Context verfügbar (Neuerstellung fehlgeschlagen)")
+
+    ok = False
+    try:
+        page = await context.new_page()
+        try:
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            await page.wait_for_selector(selector, state="attached", timeout=SELECTOR_TIMEOUT)
+            html = await page.content()
+        finally:
+            await page.close()
+        ok = True
+        return html
+    finally:
+        # Nach Fehlern oder CONTEXT_MAX_USES Seiten durch frischen Context ersetzen
+        uses += 1
+        renew = not ok or uses >= CONTEXT_MAX_USES
+        if renew:
+            old_context, context, uses = context, None, 0
+        try:
+            if renew:
+                context = await renew_context(old_context)
+        finally:
+            # Slot immer zurückgeben, auch bei Abbruch (None = nicht wiederherstellbar)
+            pool.put_nowait((context, uses))
+
+
+async def scrape_with_retry(pool, url, selector=DETAIL_SELECTOR, max_retries=MAX_RETRIES):
+    """Scrape URL mit Retry-Logik (Context aus dem Pool, nach Fehler neuer Context)."""
     for attempt in range(max_retries):
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                page.goto(url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(1500)
-                html = page.content()
-                browser.close()
-                return html
+            return await fetch_page(pool, url, selector)
         except Exception as e:
             if attempt < max_retries - 1:
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
             else:
                 raise e
 
 
-def scrape_module_list():
+def path_prefix(url):
+    """Erstes Pfad-Segment (Schlüssel für http_mode)."""
+    return urlsplit(url).path.strip('/').split('/')[0]
+
+
+def publish_hash(html):
+    """content_hash des Publikationsdatums im rohen HTML, None ohne Datum."""
+    match = PUBLISH_DATE_RE.search(html)
+    if not match:
+        return None
+    day, month, year = match.groups()
+    return calculate_hash(f"{year}-{month}-{day}")
+
+
+def has_element(html, tag):
+    """Prüfe, ob das HTML das Element wirklich enthält (nicht nur als CSS-Klasse im SPA-Gerüst)."""
+    if f"<{tag}" not in html:
+        return False
+    return lxml_html.fromstring(html).find(f".//{tag}") is not None
+
+
+async def fetch_raw(client, url):
+    """Hole rohes HTML per HTTP, None bei Fehler."""
+    try:
+        response = await client.get(url)
+    except httpx.HTTPError:
+        return None
+    return response.text if response.status_code == 200 else None
+
+
+async def fetch_html(pool, client, url, selector, tag, raw=None):
+    """Hole HTML per HTTP, falls der Server gerenderten Inhalt liefert, sonst via Playwright.
+
+    raw: bereits per HTTP geholter Body derselben URL (kein zweiter Request).
+    """
+    prefix = path_prefix(url)
+    if client is not None and http_mode.get(prefix, True):
+        if raw is None:
+            raw = await fetch_raw(client, url)
+        # Parsen ist CPU-Arbeit: im Thread, damit der Event-Loop frei bleibt
+        if raw is not None and await asyncio.to_thread(has_element, raw, tag):
+            http_mode[prefix] = True
+            return raw
+        # Für diesen Pfad-Typ künftig direkt den Browser nehmen
+        http_mode[prefix] = False
+
+    return await scrape_with_retry(pool, url, selector=selector)
+
+
+async def scrape_module_list(pool, client):
     """Scrape und dedupliziere Modulliste."""
     print("Lade Modulliste...")
-    html = scrape_with_retry(BASE_URL)
-    soup = BeautifulSoup(html, 'lxml')
+    html = await fetch_html(pool, client, BASE_URL, LIST_SELECTOR, LIST_TAG)
+    tree = lxml_html.fromstring(html)
 
-    all_modules = []
-    for item in soup.find_all('app-module-grid-item'):
-        link = item.find('a')
-        if link:
+    # Deduplizierung direkt beim Parsen: erster Eintrag pro nummer+version gewinnt
+    unique_modules = {}
+    for item in tree.iter('app-module-grid-item'):
+        link = item.find('.//a')
+        if link is not None:
             href = link.get('href', '')
-            match = re.match(r'/module/(\d+)/(\d+)/', href)
+            match = HREF_RE.match(href)
             if match:
-                text = item.get_text().strip()
-                titel_match = re.match(r'(\d{3,4})V(\d+)(.*)', text)
+                text = item.text_content().strip()
+                titel_match = TITEL_RE.match(text)
                 if titel_match:
-                    all_modules.append({
+                    key = f"{titel_match.group(1)}-{titel_match.group(2)}"
+                    if key in unique_modules:
+                        continue
+                    unique_modules[key] = {
                         'nummer': titel_match.group(1),
                         'version': titel_match.group(2),
                         'titel': titel_match.group(3).strip(),
                         'detail_url': f"{BASE_URL}{href}"
-                    })
-
-    # Deduplizierung
-    unique_modules = {}
-    for mod in all_modules:
-        key = f"{mod['nummer']}-{mod['version']}"
-        if key not in unique_modules:
-            unique_modules[key] = mod
+                    }
 
     modules_list = list(unique_modules.values())
     print(f"  Einzigartig: {len(modules_list)} Module")
     return modules_list
 
 
-def scrape_module_detail(module, index, total):
-    """Scrape Detailseite eines Moduls (für Threading)."""
+def collect_detail_nodes(tree):
+    """Sortiere die Knoten aus einem Baum-Durchlauf in Publish-, Header- und Berufs-Knoten."""
+    publish_divs, headers, beruf_spans = [], [], []
+    for el in DETAIL_NODES_XPATH(tree):
+        if el.tag == 'mat-expansion-panel-header':
+            headers.append(el)
+        elif 'publish' in (el.get('class') or '').split():
+            publish_divs.append(el)
+        else:
+            beruf_spans.append(el)
+    return publish_divs, headers, beruf_spans
+
+
+def parse_module_detail(module, html):
+    """Extrahiere Details aus dem HTML und ergänze das Modul."""
+    tree = lxml_html.fromstring(html)
+    publish_divs, headers, beruf_spans = collect_detail_nodes(tree)
+
+    # 1. PUBLIKATIONSDATUM
+    if publish_divs:
+        text = publish_divs[0].text_content()
+        match = DATE_RE.search(text)
+        if match:
+            day, month, year = match.groups()
+            pub_datum = f"{year}-{month}-{day}"
+            module['publikationsdatum'] = pub_datum
+            module['content_hash'] = calculate_hash(pub_datum)
+
+    # 2. HANDLUNGSZIELE
+    handlungsziele = []
+    for header in headers:
+        header_text = header.text_content().strip()
+        match = HZ_RE.match(header_text)
+        if match:
+            handlungsziele.append({
+                'nummer': match.group(1),
+                'beschreibung': match.group(2).strip()
+            })
+    module['handlungsziele'] = handlungsziele
+
+    # 3. BERUFE
+    berufe = []
+    seen = set()
+    for span in beruf_spans:
+        text = span.text_content().strip()
+        if text in seen:
+            continue
+        if 10 < len(text) < 150:
+            seen.add(text)
+            berufe.append(text)
+    module['berufe'] = berufe
+    module['letzter_check'] = RUN_TS
+
+
+async def scrape_module_detail(pool, client, cache, module, total):
+    """Scrape Detailseite eines Moduls (max. NUM_WORKERS gleichzeitig, begrenzt durch Pool-Größe)."""
+    url = module['detail_url']
+    cached = cache.get(f"{module['nummer']}-{module['version']}")
     try:
-        html = scrape_with_retry(module['detail_url'])
-        soup = BeautifulSoup(html, 'lxml')
-
-        # 1. PUBLIKATIONSDATUM
-        publish_div = soup.find(class_='publish')
-        if publish_div:
-            text = publish_div.get_text()
-            match = re.search(r'(\d{2}\.\d{2}\.\d{4})', text)
-            if match:
-                date_str = match.group(1)
-                day, month, year = date_str.split('.')
-                pub_datum = f"{year}-{month}-{day}"
-                module['publikationsdatum'] = pub_datum
-                module['content_hash'] = calculate_hash(pub_datum)
-
-        # 2. HANDLUNGSZIELE
-        handlungsziele = []
-        for panel in soup.find_all('mat-expansion-panel'):
-            header = panel.find('mat-expansion-panel-header')
-            if header:
-                header_text = header.get_text().strip()
-                match = re.match(r'^(\d+)\.\s*(.*)', header_text)
-                if match:
-                    handlungsziele.append({
-                        'nummer': match.group(1),
-                        'beschreibung': match.group(2).strip()
-                    })
-        module['handlungsziele'] = handlungsziele
-
-        # 3. BERUFE
-        berufe = []
-        for span in soup.find_all('span', class_='ng-star-inserted'):
-            text = span.get_text().strip()
-            if ('efz' in text.lower() or 'eba' in text.lower()) and 10 < len(text) < 150:
-                if text not in berufe:
-                    berufe.append(text)
-        module['berufe'] = berufe
-        module['letzter_check'] = datetime.now().isoformat()
-
-        with progress_lock:
-            progress_counter['completed'] += 1
-            print(f"  [{progress_counter['completed']}/{total}] Modul {module['nummer']} V{module['version']}... ✓")
+        # Cache nur nutzen, wenn das aktuelle Publikationsdatum (rohes HTTP) zum Eintrag passt
+        raw = None
+        if cached and cached.get('content_hash') and client is not None and http_mode.get(path_prefix(url), True):
+            raw = await fetch_raw(client, url)
+            if raw is not None and publish_hash(raw) == cached['content_hash']:
+                module.update(cached)
+                module['letzter_check'] = RUN_TS
+                progress_counter['cached'] += 1
+                print(f"  [{sum(progress_counter.values())}/{total}] Modul {module['nummer']} V{module['version']}... = (Cache)")
+                return module, None
+
+        html = await fetch_html(pool, client, url, DETAIL_SELECTOR, DETAIL_TAG, raw=raw)
+
+        # Parsing ist reine CPU-Arbeit: im Thread, damit der Event-Loop frei bleibt
+        await asyncio.to_thread(parse_module_detail, module, html)
+
+        progress_counter['completed'] += 1
+        print(f"  [{sum(progress_counter.values())}/{total}] Modul {module['nummer']} V{module['version']}... ✓")
 
         return module, None
 
     except Exception as e:
-        with progress_lock:
-            progress_counter['failed'] += 1
-            print(f"  [{progress_counter['completed'] + progress_counter['failed']}/{total}] Modul {module['nummer']} V{module['version']}... ✗")
+        progress_counter['failed'] += 1
+        print(f"  [{sum(progress_counter.values())}/{total}] Modul {module['nummer']} V{module['version']}... ✗")
         return module, str(e)
 
 
-def group_by_master(modules):
-    """Gruppiere Module nach Master-ID."""
+async def detail_worker(pool, client, cache, queue, berufe_queue, total, results):
+    """Hole Module aus der Queue und scrape sie, bis None (Ende) kommt."""
+    while (module := await queue.get()) is not None:
+        module, error = await scrape_module_detail(pool, client, cache, module, total)
+        results.append((module, error))
+        if error is None:
+            berufe_queue.put_nowait(module['berufe'])
+
+
+async def collect_berufe(berufe_queue, all_berufe):
+    """Einziger Konsument: sammle Berufe aus der Queue, bis None (Ende) kommt."""
+    while (berufe := await berufe_queue.get()) is not None:
+        all_berufe.extend(berufe)
+
+
+def load_detail_cache():
+    """Lade Detail-Cache (nummer-version -> Detailfelder)."""
+    if CACHE_FILE.exists():
+        return _json_io.load(CACHE_FILE)
+    return {}
+
+
+def save_detail_cache(cache, results):
+    """Übernehme erfolgreich gescrapte Details in den Cache."""
+    for module, error in results:
+        if error is None:
+            cache[f"{module['nummer']}-{module['version']}"] = {
+                field: module[field] for field in DETAIL_FIELDS if field in module
+            }
+    _json_io.dump(cache, CACHE_FILE, indent=False)
+
+
+async def scrape_all_modules():
+    """Lade Modulliste und scrape alle Module parallel in einem Browser."""
+    async with async_playwright() as p:
+        browser = await p.chromium.launch(headless=True, args=BROWSER_ARGS)
+        client = None
+        if USE_HTTP and httpx is not None:
+            client = httpx.AsyncClient(headers=HTTP_HEADERS, timeout=15, follow_redirects=True)
+
+        try:
+            pool = await create_context_pool(browser)
+
+            # 1. Modulliste laden
+            print("\n[1/4] Lade Modulliste...")
+            modules = await scrape_module_list(pool, client)
+
+            # Cache-Einträge werden pro Modul gegen das aktuelle Publikationsdatum geprüft
+            cache = load_detail_cache()
+            all_berufe = []
+            total = len(modules)
+
+            # 2. Parallel scrapen: feste Anzahl Worker zieht Module aus der Queue
+            print(f"\n[2/4] Scrape {total} Module parallel ({NUM_WORKERS} Workers):\n")
+            queue = asyncio.Queue()
+            berufe_queue = asyncio.Queue()
+            scraped = []
+            consumer = asyncio.create_task(collect_berufe(berufe_queue, all_berufe))
+            workers = [
+                asyncio.create_task(detail_worker(pool, client, cache, queue, berufe_queue, total, scraped))
+                for _ in range(NUM_WORKERS)
+            ]
+            for mod in modules:
+                queue.put_nowait(mod)
+            for _ in workers:
+                queue.put_nowait(None)
+
+            await asyncio.gather(*workers)
+            berufe_queue.put_nowait(None)
+            await consumer
+        finally:
+            if client is not None:
+                await client.aclose()
+            await browser.close()
+
+    save_detail_cache(cache, scraped)
+
+    return modules, all_berufe
+
+
+def group_by_master(modules, beruf_to_id):
+    """Gruppiere Module nach Master-ID, Berufsnamen direkt durch IDs ersetzt."""
     masters = defaultdict(list)
-    for mod in modules:
-        masters[mod['nummer']].append(mod)
 
-    for master_key in masters:
-        masters[master_key].sort(key=lambda x: int(x['version']))
+    # Einmal nach Version sortieren, dann sind die Gruppen bereits geordnet
+    for mod in sorted(modules, key=lambda x: int(x['version'])):
+        version = {key: value for key, value in mod.items() if key not in ('berufe', 'detail_url')}
+        if 'berufe' in mod:
+            version['berufe_ids'] = [beruf_to_id[b] for b in mod['berufe'] if b in beruf_to_id]
+        masters[mod['nummer']].append(version)
 
     return dict(masters)
 
 
 def create_beruf_mapping(all_berufe):
     """Erstelle Berufs-Liste mit IDs."""
-    unique_berufe = sorted(list(set(all_berufe)))
+    unique_berufe = sorted(set(all_berufe))
     return [{'id': i + 1, 'name': beruf} for i, beruf in enumerate(unique_berufe)]
 
 
 def save_final_json(masters, berufe_liste):
     """Speichere finales JSON."""
-    beruf_to_id = {beruf['name']: beruf['id'] for beruf in berufe_liste}
-
     master_modules = []
-    for nummer in sorted(masters.keys(), key=int):
-        versionen = masters[nummer]
-
-        for ver in versionen:
-            if 'berufe' in ver:
-                ver['berufe_ids'] = [beruf_to_id.get(b) for b in ver['berufe'] if b in beruf_to_id]
-                del ver['berufe']
-            if 'detail_url' in ver:
-                del ver['detail_url']
-
+    for nummer, versionen in sorted(masters.items(), key=lambda kv: int(kv[0])):
+        # Neueste Version für Master-Titel
         neueste = versionen[-1]
 
         master_modules.append({
@@ -191,7 +468,7 @@ def save_final_json(masters, berufe_liste):
     output = {
         'meta': {
             'quelle': BASE_URL,
-            'erstellt': datetime.now().isoformat(),
+            'erstellt': RUN_TS,
             'anzahl_master_module': len(master_modules),
             'anzahl_versionen_total': sum(m['anzahl_versionen'] for m in master_modules),
             'anzahl_berufe': len(berufe_liste),
@@ -202,8 +479,7 @@ def save_final_json(masters, berufe_liste):
     }
 
     output_file = OUTPUT_DIR / 'it-module-master.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    _json_io.dump(output, output_file)
 
     return output_file
 
@@ -216,35 +492,17 @@ def main():
     print(f"Parallel Master-Modul-Scraper ({NUM_WORKERS} Workers)")
     print("="*60)
 
-    # 1. Modulliste laden
-    print("\n[1/4] Lade Modulliste...")
-    modules = scrape_module_list()
-    total = len(modules)
-
-    # 2. Parallel scrapen
-    print(f"\n[2/4] Scrape {total} Module parallel ({NUM_WORKERS} Workers):\n")
-
-    all_berufe = []
-
-    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-        futures = {
-            executor.submit(scrape_module_detail, mod, i+1, total): mod
-            for i, mod in enumerate(modules)
-        }
+    modules, all_berufe = asyncio.run(scrape_all_modules())
 
-        for future in as_completed(futures):
-            result_module, error = future.result()
-            if error is None and 'berufe' in result_module:
-                all_berufe.extend(result_module['berufe'])
-
-    # 3. Gruppiere nach Master
+    # 3. Gruppiere nach Master (Berufsnamen -> IDs im selben Durchlauf)
     print(f"\n[3/4] Gruppiere nach Master-Modulen...")
-    masters = group_by_master(modules)
+    berufe_liste = create_beruf_mapping(all_berufe)
+    beruf_to_id = {beruf['name']: beruf['id'] for beruf in berufe_liste}
+    masters = group_by_master(modules, beruf_to_id)
     print(f"  Master-Module: {len(masters)}")
 
     # 4. Erstelle finales JSON
     print(f"\n[4/4] Erstelle finales JSON...")
-    berufe_liste = create_beruf_mapping(all_berufe)
     output_file = save_final_json(masters, berufe_liste)
 
     elapsed = time.time() - start_time
@@ -254,6 +512,7 @@ def main():
     print(f"   Master-Module: {len(masters)}")
     print(f"   Versionen: {sum(len(v) for v in masters.values())}")
     print(f"   Erfolgreich: {progress_counter['completed']}")
+    print(f"   Aus Cache (unverändert): {progress_counter['cached']}")
     print(f"   Fehler: {progress_counter['failed']}")
     print(f"   Berufe: {len(berufe_liste)}")
     print(f"   Größe: {output_file.stat().st_size // 1024} KB")
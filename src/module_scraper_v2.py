@@ -4,78 +4,155 @@ Optimierter Modul-Scraper für modulbaukasten.ch
 Features: Retry-Logik, Batch-Save, Resume-Funktion
 """
 
-import json
 import re
 import time
 from datetime import datetime
 from pathlib import Path
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from playwright.sync_api import sync_playwright
 
+import _json_io
+
 
 # Konfiguration
 BASE_URL = "https://www.modulbaukasten.ch"
 OUTPUT_DIR = Path("/Users/sascha/Documents/git/saw_notizen-inbox")
-PROGRESS_FILE = OUTPUT_DIR / ".scraper_progress.json"
+MODULES_FILE = OUTPUT_DIR / ".scraper_modules.json"
+PROGRESS_FILE = OUTPUT_DIR / ".scraper_progress.jsonl"
 BATCH_SIZE = 50
 MAX_RETRIES = 3
 RETRY_DELAY = 2  # Sekunden
-REQUEST_DELAY = 1  # Sekunde zwischen Requests
+TRANSIENT_RETRY_DELAY = 1  # Pause vor Retry bei Fehlern ohne 429/5xx
+
+# Ein Zeitstempel pro Lauf (letzter_check, meta.erstellt)
+RUN_TS = datetime.now().isoformat()
+
+# Chromium-Startoptionen für Headless-Scraping (kein GPU, keine Hintergrunddienste)
+BROWSER_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+# Ressourcen, die für das HTML nicht gebraucht werden
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media"}
+
+# Regex-Muster (einmalig kompiliert)
+HREF_RE = re.compile(r'/module/(\d+)/(\d+)/')
+TITEL_RE = re.compile(r'(\d{3,4})V(\d+)(.*)')
+DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+HZ_RE = re.compile(r'^(\d+)\.\s*(.*)')
+
+# XPath-Ausdruck (einmalig kompiliert, Auswertung in libxml2): ein einziger Durchlauf
+# über den Baum liefert Publish-Element, Panel-Header und Berufs-Spans (Textfilter EFZ/EBA)
+DETAIL_NODES_XPATH = etree.XPath(
+    "//*[self::mat-expansion-panel-header"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' publish ')"
+    " or (self::span and contains(concat(' ', normalize-space(@class), ' '), ' ng-star-inserted ')"
+    " and (contains(translate(., 'EFZBA', 'efzba'), 'efz') or contains(translate(., 'EFZBA', 'efzba'), 'eba')))]"
+)
+
+# Elemente, die nach dem Rendern der Angular-App vorhanden sind
+LIST_SELECTOR = "app-module-grid-item"
+DETAIL_SELECTOR = "mat-expansion-panel-header, .publish"
+SELECTOR_TIMEOUT = 10000
 
 
 def load_progress():
-    """Lade gespeicherten Fortschritt."""
+    """Lade gespeicherten Fortschritt (Modulliste + Einträge aus dem JSONL-Log)."""
+    progress = {'completed': {}, 'failed': set(), 'modules': []}
+
+    if MODULES_FILE.exists():
+        progress['modules'] = _json_io.load(MODULES_FILE)
+
     if PROGRESS_FILE.exists():
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
-    return {'completed': [], 'failed': [], 'modules': []}
+        with open(PROGRESS_FILE, 'rb+') as f:
+            valid_size = 0
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                valid_size += len(line)
+                try:
+                    entry = _json_io.loads(line)
+                except ValueError:
+                    continue
+                if 'data' in entry:
+                    progress['completed'][entry['id']] = entry['data']
+                    progress['failed'].discard(entry['id'])
+                else:
+                    progress['failed'].add(entry['id'])
+
+            # Unvollständige letzte Zeile nach Abbruch entfernen, damit weiter angehängt werden kann
+            f.truncate(valid_size)
+
+    return progress
+
+
+def log_progress(progress_log, module_id, details=None, error=None):
+    """Hänge eine Zeile an das Fortschritts-Log an (O(1) statt ganze Datei neu schreiben)."""
+    entry = {'id': module_id, 'data': details} if error is None else {'id': module_id, 'error': error}
+    progress_log.write(_json_io.dumpb(entry, indent=False, newline=True))
+
+
+def block_resources(route):
+    """Breche Requests für Bilder, CSS, Fonts und Medien ab."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
 
 
-def save_progress(progress):
-    """Speichere Fortschritt."""
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+def is_throttled(status):
+    """Rate-Limit oder Serverfehler: nur dann lohnt sich Warten vor dem nächsten Versuch."""
+    return status is not None and (status == 429 or status >= 500)
 
 
-def scrape_with_retry(url, max_retries=MAX_RETRIES):
-    """Scrape URL mit Retry-Logik."""
+def scrape_with_retry(browser, url, selector=DETAIL_SELECTOR, max_retries=MAX_RETRIES):
+    """Scrape URL mit Retry-Logik (neuer Context pro Versuch im gemeinsamen Browser)."""
     for attempt in range(max_retries):
+        status = None
+        context = browser.new_context()
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-
-                page.goto(url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(2000)
-
-                html = page.content()
-                browser.close()
-                return html
-
+            context.route("**/*", block_resources)
+            page = context.new_page()
+            response = page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            status = response.status if response else None
+            if is_throttled(status):
+                raise RuntimeError(f"HTTP {status}")
+            page.wait_for_selector(selector, state="attached", timeout=SELECTOR_TIMEOUT)
+            return page.content()
         except Exception as e:
             if attempt < max_retries - 1:
-                wait_time = RETRY_DELAY * (2 ** attempt)  # Exponential backoff
+                # 429/5xx: Exponential backoff, sonst (z.B. Timeout) kurze feste Pause
+                wait_time = RETRY_DELAY * (2 ** attempt) if is_throttled(status) else TRANSIENT_RETRY_DELAY
                 print(f"\n    Retry {attempt+1}/{max_retries} nach {wait_time}s...", end="", flush=True)
                 time.sleep(wait_time)
             else:
                 raise e
+        finally:
+            context.close()
 
 
-def scrape_module_list():
+def scrape_module_list(browser):
     """Scrape die Liste aller Module."""
     print("Lade Modulliste...")
-    html = scrape_with_retry(BASE_URL)
-    soup = BeautifulSoup(html, 'lxml')
+    html = scrape_with_retry(browser, BASE_URL, selector=LIST_SELECTOR)
+    tree = lxml_html.fromstring(html)
 
     modules = []
-    for item in soup.find_all('app-module-grid-item'):
-        link = item.find('a')
-        if link:
+    for item in tree.iter('app-module-grid-item'):
+        link = item.find('.//a')
+        if link is not None:
             href = link.get('href', '')
-            match = re.match(r'/module/(\d+)/(\d+)/', href)
+            match = HREF_RE.match(href)
             if match:
-                text = item.get_text().strip()
-                titel_match = re.match(r'(\d{3,4})V(\d+)(.*)', text)
+                text = item.text_content().strip()
+                titel_match = TITEL_RE.match(text)
                 if titel_match:
                     modules.append({
                         'nummer': titel_match.group(1),
@@ -87,55 +164,68 @@ def scrape_module_list():
     return modules
 
 
-def scrape_module_detail(url):
+def collect_detail_nodes(tree):
+    """Sortiere die Knoten aus einem Baum-Durchlauf in Publish-, Header- und Berufs-Knoten."""
+    publish_divs, headers, beruf_spans = [], [], []
+    for el in DETAIL_NODES_XPATH(tree):
+        if el.tag == 'mat-expansion-panel-header':
+            headers.append(el)
+        elif 'publish' in (el.get('class') or '').split():
+            publish_divs.append(el)
+        else:
+            beruf_spans.append(el)
+    return publish_divs, headers, beruf_spans
+
+
+def scrape_module_detail(browser, url):
     """Scrape Detailseite eines Moduls."""
-    html = scrape_with_retry(url)
-    soup = BeautifulSoup(html, 'lxml')
+    html = scrape_with_retry(browser, url)
+    tree = lxml_html.fromstring(html)
+    publish_divs, headers, beruf_spans = collect_detail_nodes(tree)
 
     details = {}
 
     # 1. PUBLIKATIONSDATUM
-    publish_div = soup.find(class_='publish')
-    if publish_div:
-        text = publish_div.get_text()
-        match = re.search(r'(\d{2}\.\d{2}\.\d{4})', text)
+    if publish_divs:
+        text = publish_divs[0].text_content()
+        match = DATE_RE.search(text)
         if match:
-            date_str = match.group(1)
-            day, month, year = date_str.split('.')
+            day, month, year = match.groups()
             details['publikationsdatum'] = f"{year}-{month}-{day}"
 
     # 2. HANDLUNGSZIELE
     handlungsziele = []
-    for panel in soup.find_all('mat-expansion-panel'):
-        header = panel.find('mat-expansion-panel-header')
-        if header:
-            header_text = header.get_text().strip()
-            match = re.match(r'^(\d+)\.\s*(.*)', header_text)
-            if match:
-                handlungsziele.append({
-                    'nummer': match.group(1),
-                    'beschreibung': match.group(2).strip()
-                })
+    for header in headers:
+        header_text = header.text_content().strip()
+        match = HZ_RE.match(header_text)
+        if match:
+            handlungsziele.append({
+                'nummer': match.group(1),
+                'beschreibung': match.group(2).strip()
+            })
 
     details['handlungsziele'] = handlungsziele
 
     # 3. BERUFE
     berufe = []
-    for span in soup.find_all('span', class_='ng-star-inserted'):
-        text = span.get_text().strip()
-        if ('efz' in text.lower() or 'eba' in text.lower()) and 10 < len(text) < 150:
-            if text not in berufe:
-                berufe.append(text)
+    seen = set()
+    for span in beruf_spans:
+        text = span.text_content().strip()
+        if text in seen:
+            continue
+        if 10 < len(text) < 150:
+            seen.add(text)
+            berufe.append(text)
 
     details['berufe'] = berufe
-    details['letzter_check'] = datetime.now().isoformat()
+    details['letzter_check'] = RUN_TS
 
     return details
 
 
 def create_beruf_mapping(all_berufe):
     """Erstelle Berufs-Liste mit IDs."""
-    unique_berufe = sorted(list(set(all_berufe)))
+    unique_berufe = sorted(set(all_berufe))
     return [{'id': i + 1, 'name': beruf} for i, beruf in enumerate(unique_berufe)]
 
 
@@ -154,7 +244,7 @@ def save_final_json(modules, berufe_liste):
     output = {
         'meta': {
             'quelle': BASE_URL,
-            'erstellt': datetime.now().isoformat(),
+            'erstellt': RUN_TS,
             'anzahl_module': len(modules),
             'anzahl_berufe': len(berufe_liste)
         },
@@ -163,8 +253,7 @@ def save_final_json(modules, berufe_liste):
     }
 
     output_file = OUTPUT_DIR / 'it-module-vollstaendig.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    _json_io.dump(output, output_file)
 
     return output_file
 
@@ -178,65 +267,72 @@ def main():
     # Lade oder erstelle Fortschritt
     progress = load_progress()
 
-    # 1. Modulliste laden (falls noch nicht vorhanden)
-    if not progress.get('modules'):
-        print("\n[1/3] Lade Modulliste...")
-        modules = scrape_module_list()
-        progress['modules'] = modules
-        save_progress(progress)
-        print(f"  ✓ {len(modules)} Module gefunden")
-    else:
-        modules = progress['modules']
-        print(f"\n[1/3] Nutze gespeicherte Modulliste ({len(modules)} Module)")
-
-    # 2. Details scrapen
-    completed_ids = set(progress.get('completed', []))
-    failed_ids = set(progress.get('failed', []))
-
-    print(f"\n[2/3] Scrape Modul-Details:")
-    print(f"  Bereits fertig: {len(completed_ids)}")
-    print(f"  Fehler: {len(failed_ids)}")
-    print(f"  Verbleibend: {len(modules) - len(completed_ids)}")
-    print()
-
-    all_berufe = []
-    batch_counter = 0
-
-    for i, module in enumerate(modules):
-        module_id = f"{module['nummer']}-{module['version']}"
-
-        # Skip bereits verarbeitete Module
-        if module_id in completed_ids:
-            continue
-
-        print(f"  [{i+1}/{len(modules)}] Modul {module['nummer']}...", end=" ", flush=True)
+    # Ein Browser für den ganzen Lauf
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=BROWSER_ARGS)
 
         try:
-            details = scrape_module_detail(module['detail_url'])
-            module.update(details)
-            all_berufe.extend(details.get('berufe', []))
-
-            progress['completed'].append(module_id)
-            if module_id in failed_ids:
-                progress['failed'].remove(module_id)
-
-            print("✓")
-            batch_counter += 1
-
-            # Batch-Save alle 50 Module
-            if batch_counter >= BATCH_SIZE:
-                save_progress(progress)
-                print(f"  💾 Fortschritt gespeichert ({len(progress['completed'])} Module)")
-                batch_counter = 0
-
-        except Exception as e:
-            print(f"✗ ({str(e)[:50]}...)")
-            progress['failed'].append(module_id)
-
-        time.sleep(REQUEST_DELAY)
-
-    # Final save
-    save_progress(progress)
+            # 1. Modulliste laden (falls noch nicht vorhanden)
+            if not progress.get('modules'):
+                print("\n[1/3] Lade Modulliste...")
+                modules = scrape_module_list(browser)
+                progress['modules'] = modules
+                _json_io.dump(modules, MODULES_FILE, indent=False)
+                print(f"  ✓ {len(modules)} Module gefunden")
+            else:
+                modules = progress['modules']
+                print(f"\n[1/3] Nutze gespeicherte Modulliste ({len(modules)} Module)")
+
+            # 2. Details scrapen
+            completed = progress['completed']
+            failed_ids = progress['failed']
+
+            print(f"\n[2/3] Scrape Modul-Details:")
+            print(f"  Bereits fertig: {len(completed)}")
+            print(f"  Fehler: {len(failed_ids)}")
+            print(f"  Verbleibend: {len(modules) - len(completed)}")
+            print()
+
+            all_berufe = []
+            batch_counter = 0
+
+            with open(PROGRESS_FILE, 'ab') as progress_log:
+                for i, module in enumerate(modules):
+                    module_id = f"{module['nummer']}-{module['version']}"
+
+                    # Bereits verarbeitete Module aus dem Log übernehmen
+                    if module_id in completed:
+                        details = completed[module_id]
+                        module.update(details)
+                        all_berufe.extend(details.get('berufe', []))
+                        continue
+
+                    print(f"  [{i+1}/{len(modules)}] Modul {module['nummer']}...", end=" ", flush=True)
+
+                    try:
+                        details = scrape_module_detail(browser, module['detail_url'])
+                        module.update(details)
+                        all_berufe.extend(details.get('berufe', []))
+
+                        completed[module_id] = details
+                        failed_ids.discard(module_id)
+                        log_progress(progress_log, module_id, details)
+
+                        print("✓")
+                        batch_counter += 1
+
+                        # Log alle 50 Module auf die Platte bringen
+                        if batch_counter >= BATCH_SIZE:
+                            progress_log.flush()
+                            print(f"  💾 Fortschritt gespeichert ({len(completed)} Module)")
+                            batch_counter = 0
+
+                    except Exception as e:
+                        print(f"✗ ({str(e)[:50]}...)")
+                        failed_ids.add(module_id)
+                        log_progress(progress_log, module_id, error=str(e))
+        finally:
+            browser.close()
 
     # 3. Erstelle Berufs-Mapping und finales JSON
     print(f"\n[3/3] Erstelle finales JSON...")
@@ -244,8 +340,8 @@ def main():
     output_file = save_final_json(modules, berufe_liste)
 
     # Cleanup
-    if PROGRESS_FILE.exists():
-        PROGRESS_FILE.unlink()
+    PROGRESS_FILE.unlink(missing_ok=True)
+    MODULES_FILE.unlink(missing_ok=True)
 
     print(f"\n✅ Erfolgreich abgeschlossen!")
     print(f"   Datei: {output_file}")
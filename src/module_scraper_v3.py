@@ -4,16 +4,18 @@ Master-Modul-System mit Deduplizierung und Change Detection
 Version 3.0 - Final
 """
 
-import json
+import functools
 import re
 import time
 import hashlib
 from datetime import datetime
 from pathlib import Path
 from collections import defaultdict
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 from playwright.sync_api import sync_playwright
 
+import _json_io
+
 
 # Konfiguration
 BASE_URL = "https://www.modulbaukasten.ch"
@@ -22,175 +24,228 @@ PROGRESS_FILE = OUTPUT_DIR / ".scraper_progress_v3.json"
 BATCH_SIZE = 50
 MAX_RETRIES = 3
 RETRY_DELAY = 2
-REQUEST_DELAY = 1
-
-
+TRANSIENT_RETRY_DELAY = 1  # Pause vor Retry bei Fehlern ohne 429/5xx
+
+# Ein Zeitstempel pro Lauf (letzter_check, meta.erstellt)
+RUN_TS = datetime.now().isoformat()
+
+# Chromium-Startoptionen für Headless-Scraping (kein GPU, keine Hintergrunddienste)
+BROWSER_ARGS = [
+    "--disable-gpu",
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+]
+
+# Ressourcen, die für das HTML nicht gebraucht werden
+BLOCKED_RESOURCE_TYPES = {"image", "stylesheet", "font", "media"}
+
+# Regex-Muster (einmalig kompiliert)
+HREF_RE = re.compile(r'/module/(\d+)/(\d+)/')
+TITEL_RE = re.compile(r'(\d{3,4})V(\d+)(.*)')
+DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+HZ_RE = re.compile(r'^(\d+)\.\s*(.*)')
+
+# XPath-Ausdruck (einmalig kompiliert, Auswertung in libxml2): ein einziger Durchlauf
+# über den Baum liefert Publish-Element, Panel-Header und Berufs-Spans (Textfilter EFZ/EBA)
+DETAIL_NODES_XPATH = etree.XPath(
+    "//*[self::mat-expansion-panel-header"
+    " or contains(concat(' ', normalize-space(@class), ' '), ' publish ')"
+    " or (self::span and contains(concat(' ', normalize-space(@class), ' '), ' ng-star-inserted ')"
+    " and (contains(translate(., 'EFZBA', 'efzba'), 'efz') or contains(translate(., 'EFZBA', 'efzba'), 'eba')))]"
+)
+
+# Elemente, die nach dem Rendern der Angular-App vorhanden sind
+LIST_SELECTOR = "app-module-grid-item"
+DETAIL_SELECTOR = "mat-expansion-panel-header, .publish"
+SELECTOR_TIMEOUT = 10000
+
+
+@functools.lru_cache(maxsize=None)
 def calculate_hash(pub_datum):
-    """Berechne Hash für Change Detection."""
+    """Berechne Hash für Change Detection (gecacht, viele Module teilen ein Datum)."""
     if not pub_datum:
         return None
+    # SHA-256 beibehalten, damit content_hash mit bestehenden Backups vergleichbar bleibt
     return hashlib.sha256(pub_datum.encode()).hexdigest()[:16]
 
 
 def load_progress():
     """Lade gespeicherten Fortschritt."""
     if PROGRESS_FILE.exists():
-        with open(PROGRESS_FILE, 'r') as f:
-            return json.load(f)
+        return _json_io.load(PROGRESS_FILE)
     return {'completed': [], 'failed': [], 'modules': {}}
 
 
 def save_progress(progress):
-    """Speichere Fortschritt."""
-    with open(PROGRESS_FILE, 'w') as f:
-        json.dump(progress, f, indent=2)
+    """Speichere Fortschritt (kompakt, nur maschinell gelesen)."""
+    _json_io.dump(progress, PROGRESS_FILE, indent=False)
+
 
+def block_resources(route):
+    """Breche Requests für Bilder, CSS, Fonts und Medien ab."""
+    if route.request.resource_type in BLOCKED_RESOURCE_TYPES:
+        route.abort()
+    else:
+        route.continue_()
 
-def scrape_with_retry(url, max_retries=MAX_RETRIES):
-    """Scrape URL mit Retry-Logik."""
+
+def is_throttled(status):
+    """Rate-Limit oder Serverfehler: nur dann lohnt sich Warten vor dem nächsten Versuch."""
+    return status is not None and (status == 429 or status >= 500)
+
+
+def scrape_with_retry(browser, url, selector=DETAIL_SELECTOR, max_retries=MAX_RETRIES):
+    """Scrape URL mit Retry-Logik (neuer Context pro Versuch im gemeinsamen Browser)."""
     for attempt in range(max_retries):
+        status = None
+        context = browser.new_context()
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                page.goto(url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(2000)
-                html = page.content()
-                browser.close()
-                return html
+            context.route("**/*", block_resources)
+            page = context.new_page()
+            response = page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            status = response.status if response else None
+            if is_throttled(status):
+                raise RuntimeError(f"HTTP {status}")
+            page.wait_for_selector(selector, state="attached", timeout=SELECTOR_TIMEOUT)
+            return page.content()
         except Exception as e:
             if attempt < max_retries - 1:
-                wait_time = RETRY_DELAY * (2 ** attempt)
+                # 429/5xx: Exponential backoff, sonst (z.B. Timeout) kurze feste Pause
+                wait_time = RETRY_DELAY * (2 ** attempt) if is_throttled(status) else TRANSIENT_RETRY_DELAY
                 print(f" Retry {attempt+1}/{max_retries}...", end="", flush=True)
                 time.sleep(wait_time)
             else:
                 raise e
+        finally:
+            context.close()
 
 
-def scrape_module_list():
+def scrape_module_list(browser):
     """Scrape und dedupliziere Modulliste."""
     print("Lade Modulliste...")
-    html = scrape_with_retry(BASE_URL)
-    soup = BeautifulSoup(html, 'lxml')
-
-    # Sammle ALLE Module (inkl. Duplikate)
-    all_modules = []
-    for item in soup.find_all('app-module-grid-item'):
-        link = item.find('a')
-        if link:
+    html = scrape_with_retry(browser, BASE_URL, selector=LIST_SELECTOR)
+    tree = lxml_html.fromstring(html)
+
+    # Deduplizierung direkt beim Parsen: erster Eintrag pro nummer+version gewinnt
+    unique_modules = {}
+    total = 0
+    for item in tree.iter('app-module-grid-item'):
+        link = item.find('.//a')
+        if link is not None:
             href = link.get('href', '')
-            match = re.match(r'/module/(\d+)/(\d+)/', href)
+            match = HREF_RE.match(href)
             if match:
-                text = item.get_text().strip()
-                titel_match = re.match(r'(\d{3,4})V(\d+)(.*)', text)
+                text = item.text_content().strip()
+                titel_match = TITEL_RE.match(text)
                 if titel_match:
-                    all_modules.append({
+                    total += 1
+                    key = f"{titel_match.group(1)}-{titel_match.group(2)}"
+                    if key in unique_modules:
+                        continue
+                    unique_modules[key] = {
                         'nummer': titel_match.group(1),
                         'version': titel_match.group(2),
                         'titel': titel_match.group(3).strip(),
                         'detail_url': f"{BASE_URL}{href}"
-                    })
-
-    # Deduplizierung: Gruppiere nach nummer+version
-    unique_modules = {}
-    for mod in all_modules:
-        key = f"{mod['nummer']}-{mod['version']}"
-        if key not in unique_modules:
-            unique_modules[key] = mod
+                    }
 
-    print(f"  Total: {len(all_modules)} Einträge")
-    print(f"  Duplikate: {len(all_modules) - len(unique_modules)}")
+    print(f"  Total: {total} Einträge")
+    print(f"  Duplikate: {total - len(unique_modules)}")
     print(f"  Einzigartig: {len(unique_modules)}")
 
     return list(unique_modules.values())
 
 
-def scrape_module_detail(url):
+def collect_detail_nodes(tree):
+    """Sortiere die Knoten aus einem Baum-Durchlauf in Publish-, Header- und Berufs-Knoten."""
+    publish_divs, headers, beruf_spans = [], [], []
+    for el in DETAIL_NODES_XPATH(tree):
+        if el.tag == 'mat-expansion-panel-header':
+            headers.append(el)
+        elif 'publish' in (el.get('class') or '').split():
+            publish_divs.append(el)
+        else:
+            beruf_spans.append(el)
+    return publish_divs, headers, beruf_spans
+
+
+def scrape_module_detail(browser, url):
     """Scrape Detailseite eines Moduls."""
-    html = scrape_with_retry(url)
-    soup = BeautifulSoup(html, 'lxml')
+    html = scrape_with_retry(browser, url)
+    tree = lxml_html.fromstring(html)
+    publish_divs, headers, beruf_spans = collect_detail_nodes(tree)
 
     details = {}
 
     # 1. PUBLIKATIONSDATUM
-    publish_div = soup.find(class_='publish')
-    if publish_div:
-        text = publish_div.get_text()
-        match = re.search(r'(\d{2}\.\d{2}\.\d{4})', text)
+    if publish_divs:
+        text = publish_divs[0].text_content()
+        match = DATE_RE.search(text)
         if match:
-            date_str = match.group(1)
-            day, month, year = date_str.split('.')
+            day, month, year = match.groups()
             pub_datum = f"{year}-{month}-{day}"
             details['publikationsdatum'] = pub_datum
             details['content_hash'] = calculate_hash(pub_datum)
 
     # 2. HANDLUNGSZIELE
     handlungsziele = []
-    for panel in soup.find_all('mat-expansion-panel'):
-        header = panel.find('mat-expansion-panel-header')
-        if header:
-            header_text = header.get_text().strip()
-            match = re.match(r'^(\d+)\.\s*(.*)', header_text)
-            if match:
-                handlungsziele.append({
-                    'nummer': match.group(1),
-                    'beschreibung': match.group(2).strip()
-                })
+    for header in headers:
+        header_text = header.text_content().strip()
+        match = HZ_RE.match(header_text)
+        if match:
+            handlungsziele.append({
+                'nummer': match.group(1),
+                'beschreibung': match.group(2).strip()
+            })
 
     details['handlungsziele'] = handlungsziele
 
     # 3. BERUFE
     berufe = []
-    for span in soup.find_all('span', class_='ng-star-inserted'):
-        text = span.get_text().strip()
-        if ('efz' in text.lower() or 'eba' in text.lower()) and 10 < len(text) < 150:
-            if text not in berufe:
-                berufe.append(text)
+    seen = set()
+    for span in beruf_spans:
+        text = span.text_content().strip()
+        if text in seen:
+            continue
+        if 10 < len(text) < 150:
+            seen.add(text)
+            berufe.append(text)
 
     details['berufe'] = berufe
-    details['letzter_check'] = datetime.now().isoformat()
+    details['letzter_check'] = RUN_TS
 
     return details
 
 
-def group_by_master(modules):
-    """Gruppiere Module nach Master-ID (Nummer)."""
+def group_by_master(modules, beruf_to_id):
+    """Gruppiere Module nach Master-ID (Nummer), Berufsnamen direkt durch IDs ersetzt."""
     masters = defaultdict(list)
 
-    for mod in modules:
-        master_key = mod['nummer']
-        masters[master_key].append(mod)
-
-    # Sortiere Versionen innerhalb jedes Masters
-    for master_key in masters:
-        masters[master_key].sort(key=lambda x: int(x['version']))
+    # Einmal nach Version sortieren, dann sind die Gruppen bereits geordnet
+    for mod in sorted(modules, key=lambda x: int(x['version'])):
+        version = {key: value for key, value in mod.items() if key not in ('berufe', 'detail_url')}
+        if 'berufe' in mod:
+            version['berufe_ids'] = [beruf_to_id[b] for b in mod['berufe'] if b in beruf_to_id]
+        masters[mod['nummer']].append(version)
 
     return dict(masters)
 
 
 def create_beruf_mapping(all_berufe):
     """Erstelle Berufs-Liste mit IDs."""
-    unique_berufe = sorted(list(set(all_berufe)))
+    unique_berufe = sorted(set(all_berufe))
     return [{'id': i + 1, 'name': beruf} for i, beruf in enumerate(unique_berufe)]
 
 
 def save_final_json(masters, berufe_liste):
     """Speichere finales JSON mit Master-Modul-Struktur."""
-    beruf_to_id = {beruf['name']: beruf['id'] for beruf in berufe_liste}
-
-    # Erstelle Master-Module
     master_modules = []
-    for nummer in sorted(masters.keys(), key=int):
-        versionen = masters[nummer]
-
-        # Ersetze Berufsnamen durch IDs in allen Versionen
-        for ver in versionen:
-            if 'berufe' in ver:
-                ver['berufe_ids'] = [beruf_to_id.get(b) for b in ver['berufe'] if b in beruf_to_id]
-                del ver['berufe']
-            if 'detail_url' in ver:
-                del ver['detail_url']
-
+    for nummer, versionen in sorted(masters.items(), key=lambda kv: int(kv[0])):
         # Neueste Version für Master-Titel
         neueste = versionen[-1]
 
@@ -205,7 +260,7 @@ def save_final_json(masters, berufe_liste):
     output = {
         'meta': {
             'quelle': BASE_URL,
-            'erstellt': datetime.now().isoformat(),
+            'erstellt': RUN_TS,
             'anzahl_master_module': len(master_modules),
             'anzahl_versionen_total': sum(m['anzahl_versionen'] for m in master_modules),
             'anzahl_berufe': len(berufe_liste),
@@ -216,8 +271,7 @@ def save_final_json(masters, berufe_liste):
     }
 
     output_file = OUTPUT_DIR / 'it-module-master.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    _json_io.dump(output, output_file)
 
     return output_file
 
@@ -228,44 +282,50 @@ def main():
     print("Master-Modul-System v3.0")
     print("="*60)
 
-    # 1. Modulliste laden und deduplizieren
-    print("\n[1/4] Lade und dedupliziere Modulliste...")
-    unique_modules = scrape_module_list()
-
-    # 2. Details scrapen
-    print(f"\n[2/4] Scrape Details für {len(unique_modules)} einzigartige Module:")
-    all_berufe = []
-    completed = 0
-    failed = 0
-
-    for i, module in enumerate(unique_modules):
-        print(f"  [{i+1}/{len(unique_modules)}] Modul {module['nummer']} V{module['version']}...", end=" ", flush=True)
+    # Ein Browser für den ganzen Lauf
+    with sync_playwright() as p:
+        browser = p.chromium.launch(headless=True, args=BROWSER_ARGS)
 
         try:
-            details = scrape_module_detail(module['detail_url'])
-            module.update(details)
-            all_berufe.extend(details.get('berufe', []))
-            completed += 1
-            print("✓")
-
-            # Batch-Save
-            if (i + 1) % BATCH_SIZE == 0:
-                print(f"  💾 Fortschritt: {completed} Module")
-
-        except Exception as e:
-            print(f"✗ ({str(e)[:40]})")
-            failed += 1
-
-        time.sleep(REQUEST_DELAY)
-
-    # 3. Gruppiere nach Master
+            # 1. Modulliste laden und deduplizieren
+            print("\n[1/4] Lade und dedupliziere Modulliste...")
+            unique_modules = scrape_module_list(browser)
+
+            # 2. Details scrapen
+            print(f"\n[2/4] Scrape Details für {len(unique_modules)} einzigartige Module:")
+            all_berufe = []
+            completed = 0
+            failed = 0
+
+            for i, module in enumerate(unique_modules):
+                print(f"  [{i+1}/{len(unique_modules)}] Modul {module['nummer']} V{module['version']}...", end=" ", flush=True)
+
+                try:
+                    details = scrape_module_detail(browser, module['detail_url'])
+                    module.update(details)
+                    all_berufe.extend(details.get('berufe', []))
+                    completed += 1
+                    print("✓")
+
+                    # Batch-Save
+                    if (i + 1) % BATCH_SIZE == 0:
+                        print(f"  💾 Fortschritt: {completed} Module")
+
+                except Exception as e:
+                    print(f"✗ ({str(e)[:40]})")
+                    failed += 1
+        finally:
+            browser.close()
+
+    # 3. Gruppiere nach Master (Berufsnamen -> IDs im selben Durchlauf)
     print(f"\n[3/4] Gruppiere nach Master-Modulen...")
-    masters = group_by_master(unique_modules)
+    berufe_liste = create_beruf_mapping(all_berufe)
+    beruf_to_id = {beruf['name']: beruf['id'] for beruf in berufe_liste}
+    masters = group_by_master(unique_modules, beruf_to_id)
     print(f"  Master-Module: {len(masters)}")
 
     # 4. Erstelle finales JSON
     print(f"\n[4/4] Erstelle finales JSON...")
-    berufe_liste = create_beruf_mapping(all_berufe)
     output_file = save_final_json(masters, berufe_liste)
 
     # Cleanup
@@ -2,109 +2,277 @@
 """
 Phase 1: HTML-Download für alle Module
 Speichert rohe HTML-Dateien für spätere lokale Verarbeitung
+Asynchron: ein Browser (persistentes Profil), viele gleichzeitige Seiten
 """
 
-import json
+import asyncio
+import hashlib
 import re
 import time
 from pathlib import Path
-from concurrent.futures import ThreadPoolExecutor, as_completed
-from bs4 import BeautifulSoup
-from playwright.sync_api import sync_playwright
-import threading
+from urllib.parse import urlsplit
+from lxml import html as lxml_html
+from playwright.async_api import async_playwright
+
+import _json_io
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+try:
+    import h2  # httpx braucht h2 für HTTP/2
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
 
 
 # Konfiguration
 BASE_URL = "https://www.modulbaukasten.ch"
 OUTPUT_DIR = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/raw_html")
-NUM_WORKERS = 5
+NUM_WORKERS = 16  # Gleichzeitig offene Seiten
 MAX_RETRIES = 3
 RETRY_DELAY = 2
-
-# Thread-safe Counter
-progress_lock = threading.Lock()
-progress_counter = {'completed': 0, 'failed': 0}
-
-
-def scrape_with_retry(url, max_retries=MAX_RETRIES):
-    """Scrape URL mit Retry-Logik."""
+USE_HTTP = True  # Erst rohes HTML per HTTP versuchen, Playwright nur als Fallback
+HTTP_HEADERS = {'User-Agent': 'Mozilla/5.0'}
+HTTP_CONCURRENCY = 100  # Gleichzeitige HTTP-Requests (HTTP/2: Streams über eine Verbindung)
+
+# Regex-Muster (einmalig kompiliert)
+HREF_RE = re.compile(r'/module/(\d+)/(\d+)/')
+TITEL_RE = re.compile(r'(\d{3,4})V(\d+)(.*)')
+# Publikationsdatum im rohen HTML (Klassen-Token "publish", nicht "publish-*"; Datum TT.MM.JJJJ)
+PUBLISH_DATE_RE = re.compile(
+    r'class="[^"]*(?<![\w-])publish(?![\w-])[^"]*"[^>]*>.{0,500}?(\d{2})\.(\d{2})\.(\d{4})', re.S
+)
+
+# Elemente, deren Vorkommen im rohen HTML zeigt, dass der Server bereits gerenderten Inhalt liefert
+LIST_TAG = "app-module-grid-item"
+DETAIL_TAG = "mat-expansion-panel"
+
+# Requests, die für das HTML nicht gebraucht werden (per CDP blockiert, damit der
+# Disk-Cache des persistenten Profils aktiv bleibt; page.route würde ihn abschalten)
+BLOCKED_URL_PATTERNS = [
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.webp", "*.ico",
+    "*.woff", "*.woff2", "*.ttf", "*.mp4", "*.webm",
+    "*google-analytics.com*", "*googletagmanager.com*", "*doubleclick.net*", "*hotjar.com*",
+]
+
+# content_hash pro Modul aus dem letzten Lauf (unveränderte Module nicht neu laden)
+HASHES_FILE = OUTPUT_DIR / ".hashes.json"
+
+# Persistentes Browser-Profil (HTTP-Cache für JS-Bundles über Läufe hinweg)
+PROFILE_DIR = OUTPUT_DIR / ".pw_profile"
+
+# Elemente, die nach dem Rendern der Angular-App vorhanden sind
+LIST_SELECTOR = "app-module-grid-item"
+DETAIL_SELECTOR = "mat-expansion-panel, mat-chip"
+SELECTOR_TIMEOUT = 10000
+
+# Chromium-Startoptionen (kein /dev/shm, kein Sandbox-Overhead)
+BROWSER_ARGS = ["--disable-dev-shm-usage", "--no-sandbox"]
+
+# Fortschritt (nur im Event-Loop verändert, daher ohne Lock)
+progress_counter = {'completed': 0, 'unchanged': 0, 'failed': 0}
+
+# Pro Pfad-Präfix gemerkt, ob rohes HTTP reicht (kein Eintrag = noch nicht geprüft)
+http_mode = {}
+
+
+async def new_page(context):
+    """Öffne Seite mit CDP-Blockliste für Bilder, Fonts, Medien und Tracking."""
+    page = await context.new_page()
+    cdp = await context.new_cdp_session(page)
+    await cdp.send("Network.enable")
+    await cdp.send("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+    return page
+
+
+async def scrape_with_retry(context, url, selector=DETAIL_SELECTOR, max_retries=MAX_RETRIES):
+    """Scrape URL mit Retry-Logik (neue Seite pro Versuch im persistenten Context)."""
     for attempt in range(max_retries):
+        page = await new_page(context)
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                page.goto(url, wait_until="networkidle", timeout=30000)
-                page.wait_for_timeout(1500)
-                html = page.content()
-                browser.close()
-                return html
+            await page.goto(url, wait_until="domcontentloaded", timeout=30000)
+            await page.wait_for_selector(selector, state="attached", timeout=SELECTOR_TIMEOUT)
+            return await page.content()
         except Exception as e:
             if attempt < max_retries - 1:
-                time.sleep(RETRY_DELAY)
+                await asyncio.sleep(RETRY_DELAY)
             else:
                 raise e
+        finally:
+            await page.close()
+
+
+def path_prefix(url):
+    """Erstes Pfad-Segment (Schlüssel für http_mode)."""
+    return urlsplit(url).path.strip('/').split('/')[0]
 
 
-def scrape_module_list():
+def publish_hash(html):
+    """content_hash wie in phase2_parse (SHA-256 des Publikationsdatums), None ohne Datum."""
+    match = PUBLISH_DATE_RE.search(html)
+    if not match:
+        return None
+    day, month, year = match.groups()
+    return hashlib.sha256(f"{year}-{month}-{day}".encode()).hexdigest()[:16]
+
+
+def load_hashes():
+    """Lade content_hash-Cache des letzten Laufs."""
+    if HASHES_FILE.exists():
+        return _json_io.load(HASHES_FILE)
+    return {}
+
+
+def has_element(html, tag):
+    """Prüfe, ob das HTML das Element wirklich enthält (nicht nur als CSS-Klasse im SPA-Gerüst)."""
+    if f"<{tag}" not in html:
+        return False
+    return lxml_html.fromstring(html).find(f".//{tag}") is not None
+
+
+async def fetch_raw(client, http_semaphore, url):
+    """Hole rohes HTML per HTTP, None bei Fehler."""
+    try:
+        async with http_semaphore:
+            response = await client.get(url)
+    except httpx.HTTPError:
+        return None
+    return response.text if response.status_code == 200 else None
+
+
+async def fetch_html(context, client, limits, url, tag, selector, raw=None):
+    """Hole HTML per HTTP, falls der Server gerenderten Inhalt liefert, sonst via Playwright.
+
+    raw: bereits per HTTP geholter Body derselben URL (kein zweiter Request).
+    """
+    http_semaphore, browser_semaphore = limits
+    prefix = path_prefix(url)
+    if client is not None and http_mode.get(prefix, True):
+        if raw is None:
+            raw = await fetch_raw(client, http_semaphore, url)
+        # Parsen ist CPU-Arbeit: im Thread, damit der Event-Loop frei bleibt
+        if raw is not None and await asyncio.to_thread(has_element, raw, tag):
+            http_mode[prefix] = True
+            return raw
+        # Für diesen Pfad-Typ künftig direkt den Browser nehmen
+        http_mode[prefix] = False
+
+    async with browser_semaphore:
+        return await scrape_with_retry(context, url, selector=selector)
+
+
+async def scrape_module_list(context, client, limits):
     """Scrape und dedupliziere Modulliste."""
     print("Lade Modulliste...")
-    html = scrape_with_retry(BASE_URL)
-    soup = BeautifulSoup(html, 'lxml')
+    html = await fetch_html(context, client, limits, BASE_URL, LIST_TAG, LIST_SELECTOR)
+    tree = lxml_html.fromstring(html)
 
-    all_modules = []
-    for item in soup.find_all('app-module-grid-item'):
-        link = item.find('a')
-        if link:
+    # Deduplizierung direkt beim Parsen: erster Eintrag pro nummer+version gewinnt
+    unique_modules = {}
+    for item in tree.iter('app-module-grid-item'):
+        link = item.find('.//a')
+        if link is not None:
             href = link.get('href', '')
-            match = re.match(r'/module/(\d+)/(\d+)/', href)
+            match = HREF_RE.match(href)
             if match:
-                text = item.get_text().strip()
-                titel_match = re.match(r'(\d{3,4})V(\d+)(.*)', text)
+                text = item.text_content().strip()
+                titel_match = TITEL_RE.match(text)
                 if titel_match:
-                    all_modules.append({
-                        'nummer': titel_match.group(1),
-                        'version': titel_match.group(2),
-                        'titel': titel_match.group(3).strip(),
+                    nummer, version, titel = titel_match.groups()
+                    unique_modules.setdefault(f"{nummer}-{version}", {
+                        'nummer': nummer,
+                        'version': version,
+                        'titel': titel.strip(),
                         'detail_url': f"{BASE_URL}{href}"
                     })
 
-    # Deduplizierung
-    unique_modules = {}
-    for mod in all_modules:
-        key = f"{mod['nummer']}-{mod['version']}"
-        if key not in unique_modules:
-            unique_modules[key] = mod
-
     modules_list = list(unique_modules.values())
     print(f"  Einzigartig: {len(modules_list)} Module")
     return modules_list
 
 
-def download_module_html(module, index, total):
-    """Download HTML eines Moduls (für Threading)."""
+async def download_module_html(context, client, limits, hashes, module, total):
+    """Download HTML eines Moduls (HTTP max. HTTP_CONCURRENCY, Browser max. NUM_WORKERS gleichzeitig)."""
+    key = f"{module['nummer']}-{module['version']}"
+    filename = f"modul-{module['nummer']}-v{module['version']}.html"
+    filepath = OUTPUT_DIR / filename
+
     try:
-        html = scrape_with_retry(module['detail_url'])
+        url = module['detail_url']
+        raw = None
 
-        # Speichere HTML
-        filename = f"modul-{module['nummer']}-v{module['version']}.html"
-        filepath = OUTPUT_DIR / filename
+        # Vorab-Check per HTTP: gleiches Publikationsdatum wie beim letzten Lauf -> nicht neu laden
+        # (nur solange rohes HTTP Inhalt liefert; bei reinem SPA-Gerüst fehlt das Datum ohnehin)
+        if client is not None and hashes.get(key) and filepath.exists() and http_mode.get(path_prefix(url), True):
+            raw = await fetch_raw(client, limits[0], url)
+            if raw is not None and publish_hash(raw) == hashes[key]:
+                progress_counter['unchanged'] += 1
+                print(f"  [{sum(progress_counter.values())}/{total}] {filename}... = (unverändert)")
+                return module, None
 
-        with open(filepath, 'w', encoding='utf-8') as f:
-            f.write(html)
+        html = await fetch_html(context, client, limits, url, DETAIL_TAG, DETAIL_SELECTOR, raw=raw)
 
-        with progress_lock:
-            progress_counter['completed'] += 1
-            print(f"  [{progress_counter['completed']}/{total}] {filename}... ✓")
+        # Speichere HTML (Datei-I/O im Thread, damit der Event-Loop frei bleibt)
+        await asyncio.to_thread(filepath.write_text, html, encoding='utf-8')
+
+        content_hash = publish_hash(html)
+        if content_hash:
+            hashes[key] = content_hash
+
+        progress_counter['completed'] += 1
+        print(f"  [{sum(progress_counter.values())}/{total}] {filename}... ✓")
 
         return module, None
 
     except Exception as e:
-        with progress_lock:
-            progress_counter['failed'] += 1
-            print(f"  [{progress_counter['completed'] + progress_counter['failed']}/{total}] Modul {module['nummer']} V{module['version']}... ✗")
+        progress_counter['failed'] += 1
+        print(f"  [{sum(progress_counter.values())}/{total}] Modul {module['nummer']} V{module['version']}... ✗")
         return module, str(e)
 
 
+async def download_all_modules(hashes):
+    """Lade Modulliste und alle Modul-Seiten in einem Browser."""
+    async with async_playwright() as p:
+        context = await p.chromium.launch_persistent_context(
+            user_data_dir=PROFILE_DIR, headless=True, args=BROWSER_ARGS
+        )
+        client = None
+        if USE_HTTP and httpx is not None:
+            # Mit HTTP/2 laufen alle Requests als Streams über eine TLS-Verbindung
+            client = httpx.AsyncClient(
+                headers=HTTP_HEADERS,
+                timeout=30,
+                follow_redirects=True,
+                http2=HTTP2,
+                limits=httpx.Limits(max_connections=HTTP_CONCURRENCY),
+            )
+
+        # HTTP und Browser getrennt begrenzt: Playwright nur für Seiten ohne gerenderten Inhalt
+        limits = (asyncio.Semaphore(HTTP_CONCURRENCY), asyncio.Semaphore(NUM_WORKERS))
+
+        try:
+            # 1. Modulliste laden
+            print("\n[1/3] Lade Modulliste...")
+            modules = await scrape_module_list(context, client, limits)
+            total = len(modules)
+
+            # 2. Parallel HTML herunterladen
+            print(f"\n[2/3] Downloade {total} HTML-Seiten ({NUM_WORKERS} Workers):\n")
+            results = await asyncio.gather(*[
+                download_module_html(context, client, limits, hashes, mod, total)
+                for mod in modules
+            ])
+        finally:
+            if client is not None:
+                await client.aclose()
+            await context.close()
+
+    return modules, results
+
+
 def save_module_index(modules):
     """Speichere Modul-Index für Phase 2."""
     index_file = OUTPUT_DIR / 'module_index.json'
@@ -118,8 +286,7 @@ def save_module_index(modules):
             'html_file': f"modul-{mod['nummer']}-v{mod['version']}.html"
         })
 
-    with open(index_file, 'w', encoding='utf-8') as f:
-        json.dump(module_index, f, indent=2, ensure_ascii=False)
+    _json_io.dump(module_index, index_file)
 
     return index_file
 
@@ -135,29 +302,16 @@ def main():
     # Erstelle Output-Verzeichnis
     OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
 
-    # 1. Modulliste laden
-    print("\n[1/3] Lade Modulliste...")
-    modules = scrape_module_list()
-    total = len(modules)
-
-    # 2. Parallel HTML herunterladen
-    print(f"\n[2/3] Downloade {total} HTML-Seiten ({NUM_WORKERS} Workers):\n")
-
-    failed_modules = []
-
-    with ThreadPoolExecutor(max_workers=NUM_WORKERS) as executor:
-        futures = {
-            executor.submit(download_module_html, mod, i+1, total): mod
-            for i, mod in enumerate(modules)
-        }
+    # 1. + 2. Modulliste laden und HTML herunterladen
+    hashes = load_hashes()
+    modules, results = asyncio.run(download_all_modules(hashes))
+    _json_io.dump(hashes, HASHES_FILE)
 
-        for future in as_completed(futures):
-            result_module, error = future.result()
-            if error:
-                failed_modules.append({
-                    'module': result_module,
-                    'error': error
-                })
+    failed_modules = [
+        {'module': result_module, 'error': error}
+        for result_module, error in results
+        if error
+    ]
 
     # 3. Speichere Index
     print(f"\n[3/3] Erstelle Modul-Index...")
@@ -168,6 +322,7 @@ def main():
     print(f"\n✅ Phase 1 abgeschlossen!")
     print(f"   Verzeichnis: {OUTPUT_DIR}")
     print(f"   HTML-Dateien: {progress_counter['completed']}")
+    print(f"   Unverändert: {progress_counter['unchanged']}")
     print(f"   Fehler: {progress_counter['failed']}")
     print(f"   Index: {index_file}")
     print(f"   Zeit: {elapsed:.1f} Sekunden")
@@ -6,55 +6,73 @@ Phase 2: Lokales HTML-Parsing mit korrekter Datenextraktion
 - Publikationsdatum
 """
 
-import json
+import functools
+import os
 import re
 import hashlib
 from pathlib import Path
 from datetime import datetime
 from collections import defaultdict
-from bs4 import BeautifulSoup
+from concurrent.futures import ProcessPoolExecutor
+from lxml import etree, html as lxml_html
+
+import _json_io
 
 
 # Konfiguration
 RAW_HTML_DIR = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/raw_html")
 OUTPUT_DIR = Path("/Users/sascha/Documents/git/wiss_data_it-module/data")
 
+# HTML-Dateien sind UTF-8 (phase1_download); Kodierung fest vorgeben
+HTML_PARSER = lxml_html.HTMLParser(encoding='utf-8')
+
+# Regex-Muster (einmalig kompiliert)
+DATE_RE = re.compile(r'(\d{2})\.(\d{2})\.(\d{4})')
+HZ_RE = re.compile(r'^(\d+)\.\s*(.*)')
+# Kenntnisse im Format "1. Kennt...", "2. Kennt...", etc.
+KENNTNIS_RE = re.compile(r'\d+\.\s*Kennt[^\.]+(?:\([^\)]+\))?\.(?:\s*\([^\)]+\))?')
+
+# XPath-Ausdrücke (einmalig kompiliert, Klassen-Token wie bs4 class_=...)
+PUBLISH_XPATH = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' publish ')]")
+CONTENT_XPATH = etree.XPath(
+    ".//*[contains(concat(' ', normalize-space(@class), ' '), ' mat-expansion-panel-content ')]"
+)
 
+
+@functools.lru_cache(maxsize=None)
 def calculate_hash(pub_datum):
-    """Berechne Hash für Change Detection."""
+    """Berechne Hash für Change Detection (gecacht, viele Module teilen ein Datum)."""
     if not pub_datum:
         return None
+    # SHA-256 beibehalten, damit content_hash mit bestehenden Backups vergleichbar bleibt
     return hashlib.sha256(pub_datum.encode()).hexdigest()[:16]
 
 
 def parse_module_html(html_file):
     """Parse HTML-Datei und extrahiere alle Daten."""
-    with open(html_file, 'r', encoding='utf-8') as f:
-        html = f.read()
-
-    soup = BeautifulSoup(html, 'lxml')
+    # libxml2 liest die Datei selbst (keine Bytes-Kopie im Python-Heap)
+    tree = lxml_html.parse(str(html_file), parser=HTML_PARSER).getroot()
     details = {}
 
     # 1. PUBLIKATIONSDATUM
-    publish_div = soup.find(class_='publish')
-    if publish_div:
-        text = publish_div.get_text()
-        match = re.search(r'(\d{2}\.\d{2}\.\d{4})', text)
+    publish_divs = PUBLISH_XPATH(tree)
+    if publish_divs:
+        text = publish_divs[0].text_content()
+        match = DATE_RE.search(text)
         if match:
-            date_str = match.group(1)
-            day, month, year = date_str.split('.')
+            day, month, year = match.groups()
             pub_datum = f"{year}-{month}-{day}"
             details['publikationsdatum'] = pub_datum
             details['content_hash'] = calculate_hash(pub_datum)
 
     # 2. HANDLUNGSZIELE MIT HANDLUNGSNOTWENDIGEN KENNTNISSEN
     handlungsziele = []
-    for panel in soup.find_all('mat-expansion-panel'):
+    for panel in tree.iter('mat-expansion-panel'):
         # Header = Handlungsziel
-        header = panel.find('mat-expansion-panel-header')
-        if header:
-            header_text = header.get_text().strip()
-            match = re.match(r'^(\d+)\.\s*(.*)', header_text)
+        header = panel.find('.//mat-expansion-panel-header')
+        if header is not None:
+            header_text = header.text_content().strip()
+            match = HZ_RE.match(header_text)
             if match:
                 handlungsziel = {
                     'nummer': match.group(1),
@@ -62,15 +80,12 @@ def parse_module_html(html_file):
                 }
 
                 # Content = Handlungsnotwendige Kenntnisse
-                content_div = panel.find(class_='mat-expansion-panel-content')
-                if content_div:
-                    content_text = content_div.get_text().strip()
-
-                    # Extrahiere Kenntnisse (Format: "1. Kennt...", "2. Kennt...", etc.)
-                    kenntnisse = re.findall(
-                        r'\d+\.\s*Kennt[^\.]+(?:\([^\)]+\))?\.(?:\s*\([^\)]+\))?',
-                        content_text
-                    )
+                content_divs = CONTENT_XPATH(panel)
+                if content_divs:
+                    content_text = content_divs[0].text_content().strip()
+
+                    # Extrahiere Kenntnisse
+                    kenntnisse = KENNTNIS_RE.findall(content_text)
                     if kenntnisse:
                         handlungsziel['handlungsnotwendige_kenntnisse'] = [
                             k.strip() for k in kenntnisse
@@ -81,18 +96,24 @@ def parse_module_html(html_file):
     details['handlungsziele'] = handlungsziele
 
     # 3. BERUFE (korrekt aus mat-chip)
-    berufe = []
-    for chip in soup.find_all('mat-chip'):
-        text = chip.get_text().strip()
-        if text and text not in berufe:
-            berufe.append(text)
+    # Dict-Schlüssel: Duplikate in O(1) erkennen, Reihenfolge bleibt erhalten
+    berufe = dict.fromkeys(chip.text_content().strip() for chip in tree.iter('mat-chip'))
+    berufe.pop('', None)
 
-    details['berufe'] = berufe
+    details['berufe'] = list(berufe)
     details['letzter_check'] = datetime.now().isoformat()
 
     return details
 
 
+def parse_module_file(html_file):
+    """Parse HTML-Datei im Worker-Prozess, Fehler als Text zurückgeben."""
+    try:
+        return parse_module_html(html_file), None
+    except Exception as e:
+        return None, str(e)
+
+
 def group_by_master(modules):
     """Gruppiere Module nach Master-ID."""
     masters = defaultdict(list)
@@ -113,64 +134,60 @@ def create_beruf_mapping(all_berufe):
 
 
 def save_final_json(masters, berufe_liste):
-    """Speichere finales JSON mit Master-Modul-Struktur."""
+    """Speichere finales JSON mit Master-Modul-Struktur (Module werden einzeln geschrieben)."""
     beruf_to_id = {beruf['name']: beruf['id'] for beruf in berufe_liste}
 
-    # Erstelle Master-Module
-    master_modules = []
-    for nummer in sorted(masters.keys(), key=int):
-        versionen = masters[nummer]
+    # Ersetze Berufsnamen durch IDs und zähle Statistiken in einem Durchlauf
+    total_handlungsziele = 0
+    total_kenntnisse = 0
+    versionen_mit_kenntnissen = 0
 
-        # Ersetze Berufsnamen durch IDs in allen Versionen
+    for versionen in masters.values():
         for ver in versionen:
             if 'berufe' in ver:
                 ver['berufe_ids'] = [beruf_to_id.get(b) for b in ver['berufe'] if b in beruf_to_id]
                 del ver['berufe']
 
-        # Neueste Version für Master-Titel
-        neueste = versionen[-1]
-
-        master_modules.append({
-            'master_id': f"M{nummer}",
-            'nummer': nummer,
-            'titel_master': neueste.get('titel', ''),
-            'anzahl_versionen': len(versionen),
-            'versionen': versionen
-        })
-
-    # Statistiken für handlungsnotwendige Kenntnisse
-    total_handlungsziele = 0
-    total_kenntnisse = 0
-    versionen_mit_kenntnissen = 0
-
-    for master in master_modules:
-        for version in master['versionen']:
-            if 'handlungsziele' in version:
-                total_handlungsziele += len(version['handlungsziele'])
-                for hz in version['handlungsziele']:
+            if 'handlungsziele' in ver:
+                total_handlungsziele += len(ver['handlungsziele'])
+                for hz in ver['handlungsziele']:
                     if 'handlungsnotwendige_kenntnisse' in hz:
                         total_kenntnisse += len(hz['handlungsnotwendige_kenntnisse'])
                         versionen_mit_kenntnissen += 1
 
-    output = {
+    def iter_master_modules():
+        """Erzeuge Master-Module erst beim Schreiben (keine Gesamtliste im Speicher)."""
+        for nummer in sorted(masters.keys(), key=int):
+            versionen = masters[nummer]
+
+            # Neueste Version für Master-Titel
+            neueste = versionen[-1]
+
+            yield {
+                'master_id': f"M{nummer}",
+                'nummer': nummer,
+                'titel_master': neueste.get('titel', ''),
+                'anzahl_versionen': len(versionen),
+                'versionen': versionen
+            }
+
+    head = {
         'meta': {
             'quelle': 'https://www.modulbaukasten.ch',
             'erstellt': datetime.now().isoformat(),
-            'anzahl_master_module': len(master_modules),
-            'anzahl_versionen_total': sum(m['anzahl_versionen'] for m in master_modules),
+            'anzahl_master_module': len(masters),
+            'anzahl_versionen_total': sum(len(v) for v in masters.values()),
             'anzahl_berufe': len(berufe_liste),
             'anzahl_handlungsziele_total': total_handlungsziele,
             'anzahl_kenntnisse_total': total_kenntnisse,
             'versionen_mit_kenntnissen': versionen_mit_kenntnissen,
             'system': 'Phase 2: Lokales Parsing mit vollständiger Datenextraktion'
         },
-        'berufe': berufe_liste,
-        'module': master_modules
+        'berufe': berufe_liste
     }
 
     output_file = OUTPUT_DIR / 'it-module-master.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(output, f, indent=2, ensure_ascii=False)
+    _json_io.dump_stream(head, 'module', iter_master_modules(), output_file)
 
     return output_file
 
@@ -185,26 +202,30 @@ def main():
     print("\n[1/3] Lade Modul-Index...")
     index_file = RAW_HTML_DIR / 'module_index.json'
 
-    with open(index_file, 'r') as f:
-        module_index = json.load(f)
+    module_index = _json_io.load(index_file)
 
     print(f"  {len(module_index)} Module im Index")
 
-    # 2. Parse alle HTML-Dateien
-    print(f"\n[2/3] Parse {len(module_index)} HTML-Dateien:\n")
+    # 2. Parse alle HTML-Dateien (reine CPU-Arbeit: auf alle Kerne verteilt)
+    print(f"\n[2/3] Parse {len(module_index)} HTML-Dateien ({os.cpu_count()} Prozesse):\n")
 
     all_modules = []
     all_berufe = []
     completed = 0
     failed = 0
 
-    for i, mod_info in enumerate(module_index, 1):
-        html_file = RAW_HTML_DIR / mod_info['html_file']
+    html_files = [RAW_HTML_DIR / mod_info['html_file'] for mod_info in module_index]
 
-        print(f"  [{i}/{len(module_index)}] {mod_info['html_file']}...", end=" ", flush=True)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        results = executor.map(parse_module_file, html_files, chunksize=8)
 
-        try:
-            details = parse_module_html(html_file)
+        for i, (mod_info, (details, error)) in enumerate(zip(module_index, results), 1):
+            print(f"  [{i}/{len(module_index)}] {mod_info['html_file']}...", end=" ", flush=True)
+
+            if error is not None:
+                print(f"✗ ({error[:40]})")
+                failed += 1
+                continue
 
             module = {
                 'nummer': mod_info['nummer'],
@@ -218,10 +239,6 @@ def main():
             completed += 1
             print("✓")
 
-        except Exception as e:
-            print(f"✗ ({str(e)[:40]})")
-            failed += 1
-
     # 3. Gruppiere nach Master und erstelle JSON
     print(f"\n[3/3] Erstelle Master-Modul-JSON...")
     masters = group_by_master(all_modules)
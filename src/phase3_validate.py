@@ -4,10 +4,11 @@ Phase 3: Validierung der extrahierten Daten
 Prüft Vollständigkeit und Qualität der Daten
 """
 
-import json
 from pathlib import Path
 from collections import defaultdict
 
+import _json_io
+
 
 # Konfiguration
 JSON_FILE = Path("/Users/sascha/Documents/git/saw_notizen-inbox/it-module-master.json")
@@ -16,8 +17,7 @@ VALIDATION_REPORT = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/v
 
 def load_json():
     """Lade JSON-Datei."""
-    with open(JSON_FILE, 'r') as f:
-        return json.load(f)
+    return _json_io.load(JSON_FILE)
 
 
 def validate_data(data):
@@ -59,6 +59,9 @@ def validate_data(data):
     handlungsziele_stats = defaultdict(int)
     kenntnisse_stats = defaultdict(int)
 
+    # Bis zu 3 Module mit vollständigen Daten (im selben Durchlauf gesammelt)
+    vollstaendige_module = []
+
     for master in data['module']:
         for version in master['versionen']:
             modul_key = f"{master['nummer']}-V{version['version']}"
@@ -80,14 +83,24 @@ def validate_data(data):
 
                 # Kenntnisse
                 hat_kenntnisse = False
+                total_kenntnisse = 0
                 for hz in handlungsziele:
                     kenntnisse = hz.get('handlungsnotwendige_kenntnisse', [])
                     if kenntnisse:
                         hat_kenntnisse = True
                         kenntnisse_stats[len(kenntnisse)] += 1
+                        total_kenntnisse += len(kenntnisse)
 
                 if not hat_kenntnisse:
                     modules_ohne_kenntnisse.append(modul_key)
+                elif (len(vollstaendige_module) < 3 and
+                      version.get('berufe_ids') and
+                      version.get('publikationsdatum')):
+                    vollstaendige_module.append({
+                        'master': master,
+                        'version': version,
+                        'total_kenntnisse': total_kenntnisse
+                    })
 
     # Ausgabe
     report.append(f"  Module ohne Berufe: {len(modules_ohne_berufe)}")
@@ -128,31 +141,6 @@ def validate_data(data):
     report.append("6. BEISPIEL-MODULE (mit vollständigen Daten):")
     report.append("-" * 40)
 
-    # Finde 3 Module mit vollständigen Daten
-    vollstaendige_module = []
-    for master in data['module']:
-        for version in master['versionen']:
-            if (version.get('berufe_ids') and
-                version.get('handlungsziele') and
-                version.get('publikationsdatum')):
-
-                # Prüfe ob mindestens ein Handlungsziel Kenntnisse hat
-                hat_kenntnisse = any(
-                    hz.get('handlungsnotwendige_kenntnisse')
-                    for hz in version['handlungsziele']
-                )
-
-                if hat_kenntnisse:
-                    vollstaendige_module.append({
-                        'master': master,
-                        'version': version
-                    })
-
-                if len(vollstaendige_module) >= 3:
-                    break
-        if len(vollstaendige_module) >= 3:
-            break
-
     for i, item in enumerate(vollstaendige_module, 1):
         master = item['master']
         version = item['version']
@@ -161,12 +149,7 @@ def validate_data(data):
         report.append(f"    Publikationsdatum: {version.get('publikationsdatum')}")
         report.append(f"    Berufe: {len(version.get('berufe_ids', []))}")
         report.append(f"    Handlungsziele: {len(version.get('handlungsziele', []))}")
-
-        total_kenntnisse = sum(
-            len(hz.get('handlungsnotwendige_kenntnisse', []))
-            for hz in version.get('handlungsziele', [])
-        )
-        report.append(f"    Kenntnisse gesamt: {total_kenntnisse}")
+        report.append(f"    Kenntnisse gesamt: {item['total_kenntnisse']}")
 
     report.append("")
 
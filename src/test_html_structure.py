@@ -2,15 +2,19 @@
 """Test HTML-Struktur einer Modul-Seite analysieren"""
 
 from pathlib import Path
-from bs4 import BeautifulSoup
+from lxml import etree, html as lxml_html
 
 # Lade Beispiel-HTML
 html_file = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/raw_html/modul-326-v3.html")
 
-with open(html_file, 'r', encoding='utf-8') as f:
-    html = f.read()
+# Klassen-Token-Suche (wie bs4 class_=...), einmalig kompiliert
+PUBLISH_XPATH = etree.XPath("//*[contains(concat(' ', normalize-space(@class), ' '), ' publish ')]")
+CONTENT_XPATH = etree.XPath(
+    ".//*[contains(concat(' ', normalize-space(@class), ' '), ' mat-expansion-panel-content ')]"
+)
+SPAN_XPATH = etree.XPath("//span[contains(concat(' ', normalize-space(@class), ' '), ' ng-star-inserted ')]")
 
-soup = BeautifulSoup(html, 'lxml')
+tree = lxml_html.fromstring(html_file.read_bytes(), parser=lxml_html.HTMLParser(encoding='utf-8'))
 
 print("="*60)
 print("HTML-Struktur Analyse: Modul 326 V3")
@@ -19,16 +23,16 @@ print("="*60)
 # 1. PUBLIKATIONSDATUM
 print("\n1. PUBLIKATIONSDATUM:")
 print("-" * 40)
-publish_div = soup.find(class_='publish')
-if publish_div:
-    print(f"Gefunden: {publish_div.get_text()[:100]}")
+publish_divs = PUBLISH_XPATH(tree)
+if publish_divs:
+    print(f"Gefunden: {publish_divs[0].text_content()[:100]}")
 else:
     print("NICHT GEFUNDEN")
 
 # 2. HANDLUNGSZIELE / EXPANSION PANELS
 print("\n2. HANDLUNGSZIELE (mat-expansion-panel):")
 print("-" * 40)
-panels = soup.find_all('mat-expansion-panel')
+panels = list(tree.iter('mat-expansion-panel'))
 print(f"Anzahl Panels: {len(panels)}")
 
 if panels:
@@ -36,16 +40,16 @@ if panels:
     first_panel = panels[0]
 
     # Header
-    header = first_panel.find('mat-expansion-panel-header')
-    if header:
+    header = first_panel.find('.//mat-expansion-panel-header')
+    if header is not None:
         print(f"\nPanel 1 - Header:")
-        print(f"  {header.get_text().strip()[:150]}")
+        print(f"  {header.text_content().strip()[:150]}")
 
     # Content
-    content = first_panel.find(class_='mat-expansion-panel-content')
-    if content:
+    content_divs = CONTENT_XPATH(first_panel)
+    if content_divs:
         print(f"\nPanel 1 - Content:")
-        content_text = content.get_text().strip()
+        content_text = content_divs[0].text_content().strip()
         print(f"  Länge: {len(content_text)} Zeichen")
         print(f"  Preview: {content_text[:200]}")
     else:
@@ -54,26 +58,26 @@ if panels:
 # 3. BERUFE (mat-chip)
 print("\n3. BERUFE (mat-chip):")
 print("-" * 40)
-chips = soup.find_all('mat-chip')
+chips = list(tree.iter('mat-chip'))
 print(f"Anzahl mat-chip Elemente: {len(chips)}")
 
 if chips:
     print("\nErste 5 mat-chip Inhalte:")
     for i, chip in enumerate(chips[:5], 1):
-        text = chip.get_text().strip()
+        text = chip.text_content().strip()
         print(f"  {i}. {text[:100]}")
 
 # 4. ALTERNATIVE: span.ng-star-inserted (was wir fälschlicherweise verwendet haben)
 print("\n4. ALTERNATIVE: span.ng-star-inserted:")
 print("-" * 40)
-spans = soup.find_all('span', class_='ng-star-inserted')
+spans = SPAN_XPATH(tree)
 print(f"Anzahl span.ng-star-inserted: {len(spans)}")
 
 if spans:
     # Filter nur die mit EFZ/EBA
     beruf_spans = []
     for span in spans:
-        text = span.get_text().strip()
+        text = span.text_content().strip()
         if ('efz' in text.lower() or 'eba' in text.lower()) and 10 < len(text) < 150:
             beruf_spans.append(text)
 
@@ -1,67 +1,145 @@
 #!/usr/bin/env python3
 """Detaillierte Analyse des mat-expansion-panel Contents"""
 
+import mmap
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from bs4 import BeautifulSoup
+from lxml import etree
 import re
 
-# Lade Beispiel-HTML
-html_file = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/raw_html/modul-326-v3.html")
+# Regex-Muster (einmalig kompiliert)
+# Marker und Kenntnisse in einem Durchlauf (Gruppe 1 = Kenntnis, sonst Marker)
+CONTENT_RE = re.compile(r'Handlungsnotwendige Kenntnisse:|(\d+\.\s*Kennt[^\.]+\.)')
 
-with open(html_file, 'r', encoding='utf-8') as f:
-    html = f.read()
+# Nur die ersten Panels im Detail, Rest nur zählen
+MAX_PANELS = 2
+PANEL_TAG_RE = re.compile(rb'<mat-expansion-panel[\s>]')
 
-soup = BeautifulSoup(html, 'lxml')
+# Textinhalt wie lxml.html text_content() (iterparse liefert einfache etree-Elemente)
+TEXT_XPATH = etree.XPath('string()', smart_strings=False)
 
-print("="*60)
-print("DETAILLIERTE PANEL-CONTENT ANALYSE")
-print("="*60)
+# Content-Div eines Panels (Klassen-Token wie bs4 class_=..., einmalig kompiliert)
+CONTENT_XPATH = etree.XPath(
+    ".//*[contains(concat(' ', normalize-space(@class), ' '), ' mat-expansion-panel-content ')]"
+)
 
-panels = soup.find_all('mat-expansion-panel')
+# Trennlinie für Überschriften (einmalig erzeugt)
+BAR = "=" * 60
 
-for i, panel in enumerate(panels, 1):
-    print(f"\n{'='*60}")
-    print(f"PANEL {i}")
-    print(f"{'='*60}")
+# Beispiel-HTML (Standard ohne Argumente)
+HTML_FILE = Path("/Users/sascha/Documents/git/saw_tool_webscraper/data/raw_html/modul-326-v3.html")
 
-    # Header
-    header = panel.find('mat-expansion-panel-header')
-    if header:
-        header_text = header.get_text().strip()
-        print(f"\nHeader:")
-        print(f"  {header_text}")
 
-        # Extrahiere Nummer und Beschreibung
-        match = re.match(r'^(\d+)\.\s*(.*)', header_text)
-        if match:
-            print(f"\n  → Nummer: {match.group(1)}")
-            print(f"  → Beschreibung: {match.group(2)}")
+def split_header(text):
+    """Zerlege Header "<Nummer>. <Beschreibung>" ohne Regex, None wenn das Format nicht passt."""
+    n = 0
+    while n < len(text) and text[n].isdecimal():
+        n += 1
+    if n == 0 or text[n:n + 1] != '.':
+        return None
+    # Beschreibung wie (.*) im früheren Regex: nur bis zum ersten Zeilenumbruch
+    return text[:n], text[n + 1:].lstrip().partition('\n')[0]
 
-    # Content
-    content_div = panel.find(class_='mat-expansion-panel-content')
-    if content_div:
-        content_text = content_div.get_text().strip()
 
-        print(f"\nContent:")
-        print(f"  Länge: {len(content_text)} Zeichen")
+def analyze(html_file):
+    """Analysiere die ersten Panels einer HTML-Datei, gibt Bericht als Text zurück."""
+    lines = []
 
-        # Suche nach "Handlungsnotwendige Kenntnisse:"
-        if "Handlungsnotwendige Kenntnisse:" in content_text:
-            print("\n  ✓ Enthält 'Handlungsnotwendige Kenntnisse:'")
+    # Datei streamen: nur bis zum letzten benötigten Panel parsen
+    context = etree.iterparse(
+        str(html_file), events=('end',), tag='mat-expansion-panel', html=True, encoding='utf-8'
+    )
 
-            # Extrahiere die Kenntnisse (Nummern 1., 2., 3., etc.)
-            kenntnisse = re.findall(r'\d+\.\s*Kennt[^\.]+\.', content_text)
-            print(f"  → {len(kenntnisse)} Kenntnisse gefunden")
+    for i, (event, panel) in enumerate(context, 1):
+        lines.append(f"\n{BAR}")
+        lines.append(f"PANEL {i}")
+        lines.append(BAR)
 
-            for j, kenntnis in enumerate(kenntnisse, 1):
-                print(f"\n  Kenntnis {j}:")
-                print(f"    {kenntnis}")
+        # Header
+        header = panel.find('.//mat-expansion-panel-header')
+        if header is not None:
+            header_text = TEXT_XPATH(header).strip()
+            lines.append(f"\nHeader:")
+            lines.append(f"  {header_text}")
+
+            # Extrahiere Nummer und Beschreibung
+            parts = split_header(header_text)
+            if parts:
+                nummer, beschreibung = parts
+                lines.append(f"\n  → Nummer: {nummer}")
+                lines.append(f"  → Beschreibung: {beschreibung}")
+
+        # Content
+        content_divs = CONTENT_XPATH(panel)
+        if content_divs:
+            content_text = TEXT_XPATH(content_divs[0]).strip()
+
+            lines.append(f"\nContent:")
+            lines.append(f"  Länge: {len(content_text)} Zeichen")
+
+            # Suche nach "Handlungsnotwendige Kenntnisse:" und Kenntnissen (Nummern 1., 2., 3., etc.)
+            # Kenntnisse direkt als Ausgabezeilen anhängen, Kopfzeilen danach davor einfügen
+            start = len(lines)
+            hat_marker = False
+            count = 0
+            for match in CONTENT_RE.finditer(content_text):
+                kenntnis = match.group(1)
+                if kenntnis is None:
+                    hat_marker = True
+                else:
+                    count += 1
+                    lines.append(f"\n  Kenntnis {count}:")
+                    lines.append(f"    {kenntnis}")
+
+            if hat_marker:
+                lines[start:start] = [
+                    "\n  ✓ Enthält 'Handlungsnotwendige Kenntnisse:'",
+                    f"  → {count} Kenntnisse gefunden",
+                ]
+            else:
+                del lines[start:]
+                lines.append(f"\n  Content Text:")
+                lines.append(f"    {content_text[:300]}")
         else:
-            print(f"\n  Content Text:")
-            print(f"    {content_text[:300]}")
-    else:
-        print("\n  ✗ Kein Content gefunden")
-
-    if i >= 2:  # Nur erste 2 Panels im Detail
-        print(f"\n[... {len(panels) - 2} weitere Panels ...]")
-        break
+            lines.append("\n  ✗ Kein Content gefunden")
+
+        # Verarbeitete Elemente freigeben
+        panel.clear()
+        while panel.getprevious() is not None:
+            del panel.getparent()[0]
+
+        if i >= MAX_PANELS:
+            # Restliche Panels nicht parsen, nur in der gemappten Datei zählen (keine Bytes-Kopie)
+            with open(html_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                panel_count = len(PANEL_TAG_RE.findall(mm))
+            lines.append(f"\n[... {panel_count - MAX_PANELS} weitere Panels ...]")
+            break
+
+    return "".join(line + "\n" for line in lines)
+
+
+def main():
+    """Analysiere Beispiel-HTML oder alle übergebenen Dateien/Verzeichnisse."""
+    html_files = []
+    for arg in sys.argv[1:]:
+        path = Path(arg)
+        html_files.extend(sorted(path.glob('*.html')) if path.is_dir() else [path])
+
+    print(BAR)
+    print("DETAILLIERTE PANEL-CONTENT ANALYSE")
+    print(BAR)
+
+    if not sys.argv[1:]:
+        sys.stdout.write(analyze(HTML_FILE))
+        return
+
+    # Mehrere Dateien: reine CPU-Arbeit, auf alle Kerne verteilt (Ausgabe in Eingabe-Reihenfolge)
+    with ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+        for html_file, report in zip(html_files, executor.map(analyze, html_files, chunksize=8)):
+            sys.stdout.write(f"\n{html_file.name}\n{report}")
+
+
+if __name__ == "__main__":
+    main()